@@ -3,14 +3,17 @@
 
 from typing import Type, Union, Dict, NoReturn
 
-from hoshino import Service, R, util
+from hoshino import Service, R
 from hoshino.typing import CQEvent, MessageSegment
 
 import os
+import base64
 import asyncio
+import nonebot
 
 from ..utils import engine
 from ..utils import manager
+from ..utils import cache
 from .init import cfgmgr
 
 PATH_ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -31,6 +34,15 @@ def set_default_config(config: Dict={}) -> Dict:
 	config.setdefault('time_limit', 30)
 	return config
 
+async def warm_engines() -> NoReturn:
+	# indexes of the engines in use are built before the first query needs them
+	config = await cfgmgr.load({})
+	engine.warm_engines(
+		set_default_config(dict(x.get(NAME_MODULE, {})))['engine'] for x in [{}, *config.values()]
+	)
+
+nonebot.get_bot().server_app.before_serving(warm_engines)
+
 @sv.on_fullmatch(('sv猜卡牌引擎列表', ))
 async def sv_card_guess_engine_list(bot, ev: CQEvent):
 	await bot.send(ev, '列表：\n' + '\n'.join([f"引擎: {name}, 源: {source}" for name, source in engine.list_engines()]), at_sender=True)
@@ -102,7 +114,8 @@ async def sv_card_guess(bot, ev: CQEvent):
 		sv.logger.debug(f"card image: {card['image']}")
 
 		card_image = await eg.get_std_card_image(card)
-		card_image_crop = eg.get_std_card_image_crop(card_image)
+		card_image_crop = await eg.get_std_card_image_crop_data(card_image)
+		card_image = await eg.get_std_card_image_data(card)
 	except NotImplementedError as e:
 		sv.logger.error('NotImplementedError')
 		gmmgr.finish(ev.group_id)
@@ -113,17 +126,17 @@ async def sv_card_guess(bot, ev: CQEvent):
 		await bot.finish(ev, '获取卡牌资源出错…')
 
 	img_res = get_group_image_res(gid, f"{NAME_MODULE}_origin")
-	card_image.save(img_res.path)
+	await cache.write_file_atomic(img_res.path, card_image)
 
 	answer = {
 		'names': card['names'],
-		'pattern': eg.get_std_card_names_pattern(card),
+		'matcher': eg.get_std_card_names_matcher(card),
 		'img_res': img_res,
 	}
 
 	gmmgr.set_data(ev.group_id, answer)
 
-	card_image_crop = MessageSegment.image(util.pic2b64(card_image_crop))
+	card_image_crop = MessageSegment.image(f"base64://{base64.b64encode(card_image_crop).decode()}")
 	try:
 		await bot.send(ev, f"猜猜这个图片是哪张卡牌的一部分?({config['time_limit']}s后公布答案) {card_image_crop}")
 	except Exception as e:
@@ -157,7 +170,7 @@ async def sv_card_guess_check(bot, ev: CQEvent):
 	gid = str(ev.group_id)
 	msg = ev.message.extract_plain_text()
 
-	if answer['pattern'].match(msg):
+	if answer['matcher'].match(msg):
 		gmmgr.win(ev.group_id, ev.user_id)
 
 		sv.logger.info(f"gid {ev.group_id} uid {ev.user_id} bingo~")
@@ -3,12 +3,13 @@
 
 from typing import Type, Union, Dict, NoReturn
 
-from hoshino import Service, R, util
+from hoshino import Service, R, util, priv
 from hoshino.typing import CQEvent, MessageSegment
 
 import os
 import random
 import asyncio
+import nonebot
 import aiofiles
 
 from ..utils import engine
@@ -27,12 +28,22 @@ sv = Service('影之诗猜语音', bundle='sv娱乐', help_='''
 [sv猜语音引擎设定 名称] 设定查询引擎
 '''.strip())
 # [sv猜语音解锁] 当猜语音游戏超时限未自动结束死锁时解锁
+# [sv猜语音索引 [名称]] 预先建立引擎的语音索引（超级用户）
 
 def set_default_config(config: Dict={}) -> Dict:
 	config.setdefault('engine', 'svgdb_jp')
 	config.setdefault('time_limit', 40)
 	return config
 
+async def warm_engines() -> NoReturn:
+	# indexes of the engines in use are built before the first query needs them
+	config = await cfgmgr.load({})
+	engine.warm_engines(
+		set_default_config(dict(x.get(NAME_MODULE, {})))['engine'] for x in [{}, *config.values()]
+	)
+
+nonebot.get_bot().server_app.before_serving(warm_engines)
+
 @sv.on_fullmatch(('sv猜语音引擎列表', ))
 async def sv_voice_guess_engine_list(bot, ev: CQEvent):
 	await bot.send(ev, '列表：\n' + '\n'.join([f"引擎: {name}, 源: {source}" for name, source in engine.list_engines()]), at_sender=True)
@@ -52,6 +63,38 @@ async def sv_voice_guess_engine_set(bot, ev: CQEvent):
 
 	await bot.send(ev, f"影之诗猜语音引擎变更为 {msg}", at_sender=True)
 
+@sv.on_prefix(('sv猜语音索引', ))
+async def sv_voice_guess_crawl(bot, ev: CQEvent):
+	if not priv.check_priv(ev, priv.SUPERUSER):
+		await bot.finish(ev, '仅超级用户可用', at_sender=True)
+
+	msg = ev.message.extract_plain_text().strip()
+	gid = str(ev.group_id)
+
+	if msg == '':
+		config = await cfgmgr.load({})
+		config = config.get(gid, {}).get(NAME_MODULE, {})
+		set_default_config(config)
+		msg = config['engine']
+
+	eg = engine.get_engine(msg)
+
+	if eg == None:
+		await bot.finish(ev, f"引擎 {msg} 不存在", at_sender=True)
+
+	await bot.send(ev, f"开始建立引擎 {msg} 的语音索引", at_sender=True)
+
+	try:
+		crawled, failed = await eg.crawl_std_card_voices()
+	except NotImplementedError as e:
+		sv.logger.error('NotImplementedError')
+		await bot.finish(ev, '该引擎此功能未实现')
+	except Exception as e:
+		sv.logger.critical(f"{e}")
+		await bot.finish(ev, '建立语音索引出错…')
+
+	await bot.send(ev, f"引擎 {msg} 语音索引建立完成，成功{crawled}张，失败{failed}张", at_sender=True)
+
 def get_group_voice_res(gid: str, name: str='') -> Type[None]:
 	voice_dir = os.path.join('shadowverse', 'games', 'voices')
 	os.makedirs(R.get(voice_dir).path, exist_ok=True)
@@ -88,6 +131,7 @@ async def sv_voice_guess(bot, ev: CQEvent):
 
 	try:
 		cards = await eg.search_std_cards(filters)
+		cards = await eg.filter_std_cards_with_voices(cards)
 
 		await bot.send(ev, f"使用引擎 {config['engine']} 进行查找\n将在{len(cards)}张卡牌中抽选", at_sender=False)
 
@@ -127,7 +171,7 @@ async def sv_voice_guess(bot, ev: CQEvent):
 
 	answer = {
 		'names': card['names'],
-		'pattern': eg.get_std_card_names_pattern(card),
+		'matcher': eg.get_std_card_names_matcher(card),
 		'vo_res': vo_res,
 	}
 
@@ -169,7 +213,7 @@ async def sv_voice_guess_check(bot, ev: CQEvent):
 	gid = str(ev.group_id)
 	msg = ev.message.extract_plain_text()
 
-	if answer['pattern'].match(msg):
+	if answer['matcher'].match(msg):
 		gmmgr.win(ev.group_id, ev.user_id)
 
 		sv.logger.info(f"gid {ev.group_id} uid {ev.user_id} bingo~")
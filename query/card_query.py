@@ -7,9 +7,12 @@ from hoshino import Service, R
 from hoshino.typing import CQEvent, MessageSegment
 
 import os
+import nonebot
 
 from ..utils import engine
 from ..utils import manager
+from ..utils import fonts
+from ..utils import cache
 from .init import cfgmgr
 
 PATH_ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -34,6 +37,29 @@ def set_default_config(config: Dict={}) -> Dict:
 	config.setdefault('card_margin', 16)
 	return config
 
+async def preload_fonts() -> NoReturn:
+	# parse the fonts in use before the first query needs them
+	config = await cfgmgr.load({})
+	configs = [set_default_config({})] + [
+		set_default_config(dict(x.get(NAME_MODULE, {}))) for x in config.values()
+	]
+	for font, font_size in dict.fromkeys((x['font'], x['font_size']) for x in configs):
+		if fonts.preload_font(font, font_size):
+			sv.logger.info(f"preload font {font} ({font_size}) succeed")
+		else:
+			sv.logger.error(f"preload font {font} ({font_size}) failed")
+
+nonebot.get_bot().server_app.before_serving(preload_fonts)
+
+async def warm_engines() -> NoReturn:
+	# indexes of the engines in use are built before the first query needs them
+	config = await cfgmgr.load({})
+	engine.warm_engines(
+		set_default_config(dict(x.get(NAME_MODULE, {})))['engine'] for x in [{}, *config.values()]
+	)
+
+nonebot.get_bot().server_app.before_serving(warm_engines)
+
 @sv.on_fullmatch(('sv查卡引擎列表', ))
 async def sv_search_engine_list(bot, ev: CQEvent):
 	await bot.send(ev, '列表：\n' + '\n'.join([f"引擎: {name}, 源: {source}" for name, source in engine.list_engines()]), at_sender=True)
@@ -76,7 +102,7 @@ async def sv_search(bot, ev: CQEvent):
 		await bot.finish(ev, f"未找到引擎 {config['engine']}")
 
 	try:
-		cards = await eg.search_std_cards(filters)
+		cards = await eg.search_std_cards(filters, ranked=config['count_max'])
 	except NotImplementedError as e:
 		sv.logger.critical('NotImplementedError')
 		await bot.finish(ev, '该引擎此功能未实现')
@@ -95,8 +121,7 @@ async def sv_search(bot, ev: CQEvent):
 	image_res = R.img(image_path)
 	os.makedirs(R.img(image_dir).path, exist_ok=True)
 
-	image = await eg.generate_std_cards_info_image(cards, config)
-	image.save(image_res.path)
-	image.close()
+	data = await eg.get_std_cards_info_image_data(cards, config)
+	await cache.write_file_atomic(image_res.path, data)
 
 	await bot.send(ev, f"找到{len(cards)}张卡牌，最多显示{config['count_max']}张卡牌{image_res.cqcode}", at_sender=True)
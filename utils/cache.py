@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Any, Union, List, Dict, Hashable, Callable, NoReturn
+
+import os
+import re
+import json
+import time
+import gzip
+import hashlib
+import collections
+import pickle
+import uuid
+import asyncio
+import aiofiles
+
+from hoshino import R
+
+PATH_CACHE = R.get('shadowverse', 'cache').path
+PATH_SNAPSHOTS = os.path.join(PATH_CACHE, 'snapshots')
+
+SNAPSHOT_VERSION = 2
+
+def get_source_name(source: str) -> str:
+	return re.sub(r'\W+', '_', source).strip('_')
+
+def get_snapshot_path(source: str) -> str:
+	return os.path.join(PATH_SNAPSHOTS, f"{get_source_name(source)}.v{SNAPSHOT_VERSION}.pickle.gz")
+
+async def write_file_atomic(path: str, data: bytes) -> NoReturn:
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	path_tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+	async with aiofiles.open(path_tmp, 'wb') as f:
+		await f.write(data)
+	os.replace(path_tmp, path)
+
+async def load_snapshot(source: str) -> Union[Dict[str, Any], type(None)]:
+	path = get_snapshot_path(source)
+	if not os.path.isfile(path):
+		return None
+	async with aiofiles.open(path, 'rb') as f:
+		data = await f.read()
+	# the whole dataset, keep it off the event loop
+	snapshot = await asyncio.get_running_loop().run_in_executor(
+		None, lambda: pickle.loads(gzip.decompress(data))
+	)
+	if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('source') != source:
+		return None
+	# snapshot age is tracked by mtime, so revalidation only needs a touch
+	snapshot['time'] = os.path.getmtime(path)
+	return snapshot
+
+async def save_snapshot(source: str, data: Any, validators: Dict[str, str]={}) -> NoReturn:
+	snapshot = {
+		'version':    SNAPSHOT_VERSION,
+		'source':     source,
+		'validators': validators,
+		'data':       data,
+	}
+	data = await asyncio.get_running_loop().run_in_executor(
+		None, lambda: gzip.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL), compresslevel=6)
+	)
+	await write_file_atomic(get_snapshot_path(source), data)
+
+def touch_snapshot(source: str) -> NoReturn:
+	path = get_snapshot_path(source)
+	if os.path.isfile(path):
+		os.utime(path)
+
+class DiskCache():
+
+	# content addressed by key hash, evicted in least recently used order
+	def __init__(self, path: str, max_bytes: int):
+		self._path = path
+		self._max_bytes = max_bytes
+		self._entries = None
+		self._size = 0
+
+	def _get_path(self, key: str) -> str:
+		digest = hashlib.sha1(key.encode('UTF-8')).hexdigest()
+		return os.path.join(self._path, digest[:2], digest)
+
+	def _load_entries(self) -> collections.OrderedDict:
+		if self._entries != None:
+			return self._entries
+		entries = []
+		if os.path.isdir(self._path):
+			for root, _, names in os.walk(self._path):
+				for name in names:
+					if name.endswith('.tmp'):
+						continue
+					stat = os.stat(os.path.join(root, name))
+					entries.append((stat.st_mtime, name, stat.st_size))
+		entries.sort()
+		self._entries = collections.OrderedDict((name, size) for _, name, size in entries)
+		self._size = sum(self._entries.values())
+		return self._entries
+
+	def _evict(self) -> NoReturn:
+		entries = self._load_entries()
+		while self._size > self._max_bytes and entries:
+			name, size = entries.popitem(last=False)
+			self._size -= size
+			try:
+				os.remove(os.path.join(self._path, name[:2], name))
+			except FileNotFoundError:
+				pass
+
+	def __contains__(self, key: str) -> bool:
+		return os.path.basename(self._get_path(key)) in self._load_entries()
+
+	async def get(self, key: str) -> Union[bytes, type(None)]:
+		entries = self._load_entries()
+		path = self._get_path(key)
+		name = os.path.basename(path)
+		if name not in entries:
+			return None
+		try:
+			async with aiofiles.open(path, 'rb') as f:
+				data = await f.read()
+			# mtime keeps the recency across restarts
+			os.utime(path)
+		except FileNotFoundError:
+			self._size -= entries.pop(name, 0)
+			return None
+		entries.move_to_end(name)
+		return data
+
+	async def put(self, key: str, data: bytes) -> NoReturn:
+		entries = self._load_entries()
+		path = self._get_path(key)
+		name = os.path.basename(path)
+		await write_file_atomic(path, data)
+		self._size += len(data) - entries.pop(name, 0)
+		entries[name] = len(data)
+		self._evict()
+
+class MemoryCache():
+
+	# least recently used, bounded by the summed sizeof of the values
+	def __init__(self, max_size: int, sizeof: Callable[[Any], int]=lambda x: 1):
+		self._max_size = max_size
+		self._sizeof = sizeof
+		self._entries = collections.OrderedDict()
+		self._size = 0
+		self.hits = 0
+		self.misses = 0
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def __contains__(self, key: Hashable) -> bool:
+		return key in self._entries
+
+	@property
+	def size(self) -> int:
+		return self._size
+
+	def get(self, key: Hashable, default: Any=None) -> Any:
+		if key not in self._entries:
+			self.misses += 1
+			return default
+		self.hits += 1
+		self._entries.move_to_end(key)
+		return self._entries[key][0]
+
+	def put(self, key: Hashable, value: Any) -> NoReturn:
+		self.pop(key)
+		size = self._sizeof(value)
+		if size > self._max_size:
+			return
+		self._entries[key] = (value, size)
+		self._size += size
+		while self._size > self._max_size:
+			_, (_, size) = self._entries.popitem(last=False)
+			self._size -= size
+
+	def pop(self, key: Hashable, default: Any=None) -> Any:
+		if key not in self._entries:
+			return default
+		value, size = self._entries.pop(key)
+		self._size -= size
+		return value
+
+	def clear(self) -> NoReturn:
+		self._entries.clear()
+		self._size = 0
+
+class JsonStore():
+
+	# persistent key -> value store, entries expire after ttl seconds
+	def __init__(self, path: str, ttl: float):
+		self._path = path
+		self._ttl = ttl
+		self._entries = None
+		self._lock = asyncio.Lock()
+		self._dirty = 0
+
+	async def _load_entries(self) -> Dict[str, Dict]:
+		if self._entries != None:
+			return self._entries
+		async with self._lock:
+			if self._entries == None:
+				entries = {}
+				if os.path.isfile(self._path):
+					async with aiofiles.open(self._path, 'r') as f:
+						entries = json.loads(await f.read())
+				self._entries = entries
+		return self._entries
+
+	async def keys(self) -> List[str]:
+		now = time.time()
+		return [k for k, v in (await self._load_entries()).items() if now - v['time'] < self._ttl]
+
+	async def get(self, key: str, default: Any=None) -> Any:
+		entry = (await self._load_entries()).get(key)
+		if entry == None or time.time() - entry['time'] >= self._ttl:
+			return default
+		return entry['value']
+
+	@property
+	def dirty(self) -> int:
+		# entries set since the last save
+		return self._dirty
+
+	async def set(self, key: str, value: Any) -> NoReturn:
+		(await self._load_entries())[key] = {'time': time.time(), 'value': value}
+		self._dirty += 1
+
+	async def save(self) -> NoReturn:
+		# entries are replaced, never changed in place, so a shallow copy is a consistent view
+		entries = dict(await self._load_entries())
+		self._dirty = 0
+		data = await asyncio.get_running_loop().run_in_executor(
+			None, lambda: json.dumps(entries, ensure_ascii=False).encode('UTF-8')
+		)
+		await write_file_atomic(self._path, data)
+
+	async def put(self, key: str, value: Any) -> NoReturn:
+		await self.set(key, value)
+		await self.save()
+
+_stores = {}
+
+def get_store(path: str, ttl: float) -> JsonStore:
+	if path not in _stores:
+		_stores[path] = JsonStore(path, ttl)
+	return _stores[path]
+
+async def save_stores() -> NoReturn:
+	for store in list(_stores.values()):
+		if store.dirty:
+			await store.save()
+
+IMAGE_CACHE_SIZE = 512 * 1024 * 1024
+DECODED_IMAGE_CACHE_SIZE = 128 * 1024 * 1024
+VOICE_CACHE_SIZE = 256 * 1024 * 1024
+INFO_IMAGE_CACHE_SIZE = 128 * 1024 * 1024
+
+images = DiskCache(os.path.join(PATH_CACHE, 'images'), IMAGE_CACHE_SIZE)
+voices = DiskCache(os.path.join(PATH_CACHE, 'voices'), VOICE_CACHE_SIZE)
+info_images = DiskCache(os.path.join(PATH_CACHE, 'info_images'), INFO_IMAGE_CACHE_SIZE)
+
+PATH_VOICE_MANIFESTS = os.path.join(PATH_CACHE, 'voice_manifests')
+
+def get_voice_manifest(source: str, ttl: float) -> JsonStore:
+	return get_store(os.path.join(PATH_VOICE_MANIFESTS, f"{get_source_name(source)}.json"), ttl)
@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from typing import Type, Tuple, List, Dict, Generator, NoReturn
+from typing import Type, Tuple, List, Dict, Iterable, Generator, NoReturn
 
 import os
 import re
 import logging
 import inspect
 import importlib
+import asyncio
+import nonebot
 
+from . import sessions
+from . import workers
+from . import cache
 from .engines import _base as base
 
 PATH_ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -55,6 +60,12 @@ _engines = {}
 
 load_engines()
 
+# pooled engine sessions and image workers outlive single requests, close them with the bot
+nonebot.get_bot().server_app.after_serving(sessions.pool.close)
+nonebot.get_bot().server_app.after_serving(workers.pool.close)
+# stores are saved in batches, keep what is left
+nonebot.get_bot().server_app.after_serving(cache.save_stores)
+
 def list_engines() -> List[Tuple[str, str]]:
 	return [(k, v.SOURCE) for k, v in _engines.items()]
 
@@ -63,3 +74,13 @@ def get_engines() -> Dict[str, Type[base.BaseEngine]]:
 
 def get_engine(name: str) -> Type[base.BaseEngine]:
 	return _engines.get(name)
+
+_warm_tasks = {}
+
+def warm_engines(names: Iterable[str]) -> NoReturn:
+	# in background, serving starts at once and early queries join the running loads
+	for name in names:
+		eg = get_engine(name)
+		if eg == None or name in _warm_tasks:
+			continue
+		_warm_tasks[name] = asyncio.ensure_future(eg.warm_std_index())
@@ -4,7 +4,7 @@
 from typing import List, Dict, TypedDict
 
 import abc
-import lxml.html
+import lxml.etree
 
 from . import _base as base
 
@@ -52,10 +52,18 @@ class bagoum(base.BaseEngine):
 	}
 
 	@classmethod
-	async def _fetch_data(cls) -> Dict[str, TypeBagoumCard]:
+	async def _fetch_data(cls, validators: Dict[str, str]=None) -> Dict[str, TypeBagoumCard]:
 		cls._logger.info(f"fetch data")
 		headers = cls.DEFAULT_HEADERS
-		ret = await cls._get_url_json(cls.URL, headers=headers)
+		ret = await cls._get_url_json(cls.URL, validators=validators, headers=headers)
+		cls._logger.info(f"fetch data succeed")
+		return ret
+
+	@classmethod
+	async def _fetch_std_cards(cls, validators: Dict[str, str]=None) -> List[base.TypeStdCard]:
+		cls._logger.info(f"fetch data")
+		headers = cls.DEFAULT_HEADERS
+		ret = await cls._stream_std_cards(cls.URL, validators=validators, headers=headers)
 		cls._logger.info(f"fetch data succeed")
 		return ret
 
@@ -123,25 +131,57 @@ class bagoum(base.BaseEngine):
 
 	# voice ----------------------------
 
+	@staticmethod
+	def _is_voice_table(element: lxml.etree._Element) -> bool:
+		return element.tag == 'table' and 'voiceTable' in (element.get('class') or '').split()
+
 	@classmethod
-	async def get_std_card_voices(cls, card: base.TypeStdCard) -> base.TypeStdCardVoices:
+	async def _fetch_std_card_voices(cls, card: base.TypeStdCard) -> base.TypeStdCardVoices:
 		url = f"https://sv.bagoum.com/cards/{card['id']}"
-		text = await cls._get_url_text(url, headers=cls.DEFAULT_HEADERS)
-
-		html = lxml.html.fromstring(text)
-		nodes = html.cssselect('.voiceTable > tbody > tr')
 
-		if len(nodes) == 0:
+		# parse '.voiceTable > tbody > tr' incrementally and stop downloading after the table
+		parser = lxml.etree.HTMLPullParser(events=('start', 'end'), encoding='UTF-8')
+		table = None
+		rows = []
+		chunks = cls._iter_url_chunks(url, headers=cls.DEFAULT_HEADERS)
+		try:
+			async for chunk in chunks:
+				parser.feed(chunk)
+				for event, element in parser.read_events():
+					if table == None:
+						if event == 'start' and cls._is_voice_table(element):
+							table = element
+						elif event == 'end':
+							# keep memory flat for the rest of the page
+							element.clear()
+						continue
+					if event != 'end':
+						continue
+					if element is table:
+						break
+					parent = element.getparent()
+					if (element.tag == 'tr' and parent is not None and
+						parent.tag == 'tbody' and parent.getparent() is table):
+						rows.append(element)
+				else:
+					continue
+				break
+		finally:
+			await chunks.aclose()
+
+		if len(rows) == 0:
 			return []
 
-		nodes.pop(0)
+		rows.pop(0)
 		result = []
-		for node in nodes:
-			children = node.getchildren()
-			sources = node.cssselect('source')
+		for row in rows:
+			children = row.getchildren()
+			source = next(row.iter('source'), None)
+			if not children or source is None:
+				continue
 			result.append({
-				'action': children[0].text.strip(),
-				'voice':  f"https://sv.bagoum.com{sources[0].get('src')}",
+				'action': (children[0].text or '').strip(),
+				'voice':  f"https://sv.bagoum.com{source.get('src')}",
 			})
 
 		return result
@@ -1,25 +1,58 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from typing import Any, Union, Tuple, List, Dict, TypedDict, NoReturn
+from typing import Any, Union, Tuple, List, Dict, TypedDict, Callable, Awaitable, AsyncGenerator, NoReturn
 
+import os
 import abc
 import re
-import copy
+import json
+import collections.abc
 import random
+import time
 import datetime
 import asyncio
 import aiohttp
-import aiocache
-import io
+import urllib.parse
 import PIL
 import PIL.ImageFont
-import PIL.ImageDraw
 import itertools
+import array
 
 from .. import resource
+from .. import index
+from .. import cache
+from .. import flight
+from .. import sessions
+from .. import jsonstream
+from .. import layout
+from .. import render
+from .. import workers
 from hoshino import log, config
 
+PATH_ROOT = os.path.dirname(os.path.abspath(__file__))
+PATH_CODE_ALIASES = os.path.join(PATH_ROOT, '..', '..', 'aliases.json')
+
+def load_code_aliases(path: str) -> Dict[str, Dict[str, int]]:
+	# {"faction": {"alias": code, ...}, "rarity": {...}, "type": {...}}
+	if not os.path.isfile(path):
+		return {}
+	with open(path, 'r') as f:
+		return json.load(f)
+
+CODE_ALIASES = load_code_aliases(PATH_CODE_ALIASES)
+
+flights = flight.SingleFlight()
+
+name_matchers = cache.MemoryCache(1024)
+
+text_layouts = cache.MemoryCache(4096)
+
+decoded_images = cache.MemoryCache(
+	cache.DECODED_IMAGE_CACHE_SIZE,
+	lambda x: x.size[0] * x.size[1] * len(x.getbands())
+)
+
 class TypeStdCard(TypedDict):
 	id:             str
 	names:          List[str]
@@ -35,6 +68,9 @@ class TypeStdCard(TypedDict):
 	evo_rules:      List[str]
 	evo_attributes: Tuple[int, int, int]
 	evo_image:      str
+	rarity_code:    int
+	faction_code:   int
+	type_code:      int
 
 class TypeStdCardVoice(TypedDict):
 	action: str
@@ -42,6 +78,43 @@ class TypeStdCardVoice(TypedDict):
 
 TypeStdCardVoices = List[TypeStdCardVoice]
 
+class StdCard(collections.abc.Mapping):
+
+	# read-only view of a TypeStdCard, shared between callers without copying
+	__slots__ = ('_data', )
+
+	def __init__(self, card: TypeStdCard):
+		object.__setattr__(self, '_data', {
+			k: tuple(v) if isinstance(v, list) else v for k, v in card.items()
+		})
+
+	def __getitem__(self, key: str) -> Any:
+		return self._data[key]
+
+	def __iter__(self):
+		return iter(self._data)
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+	def __setattr__(self, name: str, value: Any) -> NoReturn:
+		raise AttributeError(f"{self.__class__.__name__} is read-only")
+
+	def __delattr__(self, name: str) -> NoReturn:
+		raise AttributeError(f"{self.__class__.__name__} is read-only")
+
+	def __repr__(self) -> str:
+		return f"{self.__class__.__name__}({self._data!r})"
+
+	def __copy__(self) -> 'StdCard':
+		return self
+
+	def __deepcopy__(self, memo: Dict) -> 'StdCard':
+		return self
+
+	def __reduce__(self) -> Tuple:
+		return (self.__class__, (self._data, ))
+
 class TypeImageCropConfig(TypedDict):
 	left:   float
 	top:    float
@@ -57,102 +130,245 @@ class TypeImagesInfoConfig(TypedDict):
 	line_size_max: int
 	card_margin:   int
 
+class NameMatcher():
+
+	# answer names normalized once, messages only need one normalize and a prefix check
+	__slots__ = ('_normalize', '_names')
+
+	def __init__(self, normalize: Callable[[str], str], names: List[str]):
+		self._normalize = normalize
+		self._names = tuple(filter(None, map(normalize, names)))
+
+	def match(self, text: str) -> bool:
+		return self.match_normalized(self._normalize(text))
+
+	def match_normalized(self, text: str) -> bool:
+		return text.startswith(self._names)
+
+	def __copy__(self) -> 'NameMatcher':
+		return self
+
+	def __deepcopy__(self, memo: Dict) -> 'NameMatcher':
+		return self
+
 class BaseEngine():
 
 	_logger_name = f"{'.'.join(__name__.split('.')[2:])}@{__qualname__}"
 	_logger = log.new_logger(_logger_name, config.DEBUG)
 
+	# can override
+	STD_DATA_TTL = 86400
+	STD_DATA_RETRY = 600
+
 	@abc.abstractclassmethod
-	async def _fetch_data(cls) -> Any:
+	async def _fetch_data(cls, validators: Dict[str, str]=None) -> Any:
+		# return None if validators are given and upstream is not modified
 		raise NotImplementedError
 
 	@classmethod
-	@aiocache.cached(ttl=86400)
+	async def _fetch_std_cards(cls, validators: Dict[str, str]=None) -> Union[List[TypeStdCard], type(None)]:
+		# can override to normalize cards while the data is downloaded
+		data = await cls._fetch_data(validators=validators)
+		if data == None:
+			return None
+		return cls.to_std_cards(data)
+
+	@classmethod
+	async def _stream_std_cards(cls, url: str, validators: Dict[str, str]=None, **kwargs) -> Union[List[TypeStdCard], type(None)]:
+		# for data shaped as {id: card, ...}, the raw data is never held as a whole
+		cards = []
+		modified = await cls._get_url_json_items(
+			url,
+			lambda key, value: cards.append(cls.to_std_card(value)),
+			validators=validators,
+			**kwargs
+		)
+		return cards if modified else None
+
+	@classmethod
+	def _build_std_index(cls, cards: List[TypeStdCard], time: float=0, validators: Dict[str, str]={}) -> index.StdCardIndex:
+		# convert in place, so raw and frozen cards are not both alive
+		for i, card in enumerate(cards):
+			cards[i] = StdCard(cls.set_std_card_codes(card))
+		cls._logger.info(f"index {len(cards)} cards")
+		return index.StdCardIndex(cards, cls, time=time, validators=validators)
+
+	@classmethod
+	async def _make_std_index(cls, cards: List[TypeStdCard], time: float=0, validators: Dict[str, str]={}) -> index.StdCardIndex:
+		# building the postings takes a while, the event loop only swaps the result in
+		return await asyncio.get_running_loop().run_in_executor(
+			None, lambda: cls._build_std_index(cards, time, validators)
+		)
+
+	@classmethod
+	async def _save_std_snapshot(cls, cards: List[TypeStdCard], validators: Dict[str, str]) -> NoReturn:
+		try:
+			await cache.save_snapshot(cls.SOURCE, cards, validators)
+			cls._logger.info(f"save snapshot succeed")
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"save snapshot failed")
+
+	@classmethod
+	async def _load_std_index(cls) -> index.StdCardIndex:
+		try:
+			snapshot = await cache.load_snapshot(cls.SOURCE)
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"load snapshot failed")
+			snapshot = None
+		if snapshot != None:
+			cls._logger.info(f"load snapshot succeed")
+			return await cls._make_std_index(snapshot['data'], snapshot['time'], snapshot['validators'])
+		validators = {}
+		cards = await cls._fetch_std_cards(validators=validators)
+		if not cards:
+			# retry after STD_DATA_RETRY instead of keeping an empty dataset for a whole ttl
+			return await cls._make_std_index(cards, time.time() - cls.STD_DATA_TTL + cls.STD_DATA_RETRY)
+		await cls._save_std_snapshot(cards, validators)
+		return await cls._make_std_index(cards, time.time(), validators)
+
+	@classmethod
+	async def _refresh_std_index(cls) -> NoReturn:
+		std_index = cls.__dict__['_std_index']
+		validators = dict(std_index.validators) if len(std_index) else {}
+		try:
+			cards = await cls._fetch_std_cards(validators=validators)
+			if cards == None:
+				cls._logger.info(f"data not modified")
+				cache.touch_snapshot(cls.SOURCE)
+				std_index.time = time.time()
+				return
+			if not cards:
+				raise ValueError('empty data')
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"refresh data failed, keep stale data")
+			return
+		await cls._save_std_snapshot(cards, validators)
+		cls._std_index = await cls._make_std_index(cards, time.time(), validators)
+		cls._get_search_cache().clear()
+		cls._logger.info(f"refresh data succeed")
+
+	@classmethod
+	async def _get_std_index(cls) -> index.StdCardIndex:
+		# state is kept per engine class, never inherited from a parent engine
+		std_index = cls.__dict__.get('_std_index')
+		if std_index == None:
+			# concurrent cold callers share one load
+			std_index = await flights.do((cls, '_load_std_index'), cls._load_std_index)
+			cls._std_index = std_index
+		now = time.time()
+		if (now - std_index.time >= cls.STD_DATA_TTL and
+			now - cls.__dict__.get('_std_refresh_time', 0) >= cls.STD_DATA_RETRY):
+			# serve stale data, refresh in background
+			cls._std_refresh_time = now
+			cls._std_refresh_task = asyncio.create_task(cls._refresh_std_index())
+		return std_index
+
+	@classmethod
+	async def warm_std_index(cls) -> NoReturn:
+		# load the snapshot and build the index ahead of the first query
+		try:
+			std_index = await cls._get_std_index()
+			cls._logger.info(f"warm up {len(std_index)} cards succeed")
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"warm up failed")
+
+	@classmethod
 	async def _get_std_data(cls) -> List[TypeStdCard]:
-		return cls.to_std_cards(await cls._fetch_data())
+		return (await cls._get_std_index()).cards
 
 	# code -----------------------------
 
+	# can override
+	RARITY_ALIASES = {
+		0: ['bronze', 'ブロンズレア', 'ブロンズ', '青铜', '青銅', '铜', '銅'],
+		1: ['silver', 'シルバーレア', 'シルバー', '白银', '白銀', '银', '銀'],
+		2: ['gold', 'ゴールドレア', 'ゴールド', '黄金', '金'],
+		3: ['legendary', 'レジェンド', '传说', '傳說', '虹'],
+	}
+
+	# can override
+	FACTION_ALIASES = {
+		0: ['neutral', 'ニュートラル', '中立'],
+		1: ['forestcraft', 'エルフ', '精灵', '精靈', '妖精', '妖'],
+		2: ['swordcraft', 'ロイヤル', '皇家护卫', '皇家護衛', '皇室护卫', '皇家', '皇室', '皇'],
+		3: ['runecraft', 'ウィッチ', '法师', '法', '巫师', '巫師'],
+		4: ['dragoncraft', 'ドラゴン', '龙族', '龍族', '龙', '龍'],
+		5: ['shadowcraft', 'ネクロマンサー', '死灵法师', '死靈法師', '死灵术士', '死灵', '死', '唤灵师'],
+		6: ['bloodcraft', 'ヴァンパイア', '吸血鬼', '鬼', '血族', '暗夜伯爵'],
+		7: ['havencraft', 'ビショップ', '主教', '教'],
+		8: ['portalcraft', 'ネメシス', '复仇者', '復仇者', '超越者', '鱼'],
+	}
+
+	# can override
+	TYPE_ALIASES = {
+		0: ['followers', 'follower', 'フォロワー', '从者', '随从'],
+		1: ['spells', 'spell', 'スペル', '法术'],
+		2: ['amulets', 'amulet', 'アミュレット', '护符', '魔法阵'],
+	}
+
+	@staticmethod
+	def _normalize_rarity(rarity: str) -> str:
+		return rarity.lower().rstrip('卡')
+
+	@staticmethod
+	def _normalize_faction(faction: str) -> str:
+		return faction.lower()
+
+	@staticmethod
+	def _normalize_type(type: str) -> str:
+		return type
+
+	@classmethod
+	def _compile_code_table(cls, kind: str) -> Dict[str, int]:
+		normalize = getattr(cls, f"_normalize_{kind}")
+		table = {}
+		for code, aliases in getattr(cls, f"{kind.upper()}_ALIASES").items():
+			for alias in aliases:
+				table.setdefault(normalize(alias), code)
+		for alias, code in CODE_ALIASES.get(kind, {}).items():
+			table[normalize(alias)] = code
+		return table
+
+	@classmethod
+	def _get_code_table(cls, kind: str) -> Dict[str, int]:
+		# compiled per class, so overridden alias lists take effect
+		tables = cls.__dict__.get('_code_tables')
+		if tables == None:
+			tables = cls._code_tables = {}
+		if kind not in tables:
+			tables[kind] = cls._compile_code_table(kind)
+		return tables[kind]
+
+	@classmethod
+	def _get_code(cls, kind: str, value: str) -> int:
+		if not isinstance(value, str):
+			return -1
+		normalize = getattr(cls, f"_normalize_{kind}")
+		return cls._get_code_table(kind).get(normalize(value), -1)
+
 	@classmethod
 	def get_rarity_code(cls, rarity: str) -> int:
-		rarity = rarity.lower().rstrip('卡')
-		if rarity in [
-			'bronze', 'ブロンズレア', 'ブロンズ', '青铜', '青銅', '铜', '銅',
-		]:
-			return 0
-		if rarity in [
-			'silver', 'シルバーレア', 'シルバー', '白银', '白銀', '银', '銀',
-		]:
-			return 1
-		if rarity in [
-			'gold', 'ゴールドレア', 'ゴールド', '黄金', '金',
-		]:
-			return 2
-		if rarity in [
-			'legendary', 'レジェンド', '传说', '傳說', '虹',
-		]:
-			return 3
-		# cls._logger.error(f"unknow rarity: {rarity}")
-		return -1
+		return cls._get_code('rarity', rarity)
 
 	@classmethod
 	def get_faction_code(cls, faction: str) -> int:
-		faction = faction.lower()
-		if faction in [
-			'neutral', 'ニュートラル', '中立',
-		]:
-			return 0
-		if faction in [
-			'forestcraft', 'エルフ', '精灵', '精靈', '妖精', '妖',
-		]:
-			return 1
-		if faction in [
-			'swordcraft', 'ロイヤル', '皇家护卫', '皇家護衛', '皇室护卫', '皇家', '皇室', '皇',
-		]:
-			return 2
-		if faction in [
-			'runecraft', 'ウィッチ', '法师', '法', '巫师', '巫師',
-		]:
-			return 3
-		if faction in [
-			'dragoncraft', 'ドラゴン', '龙族', '龍族', '龙', '龍',
-		]:
-			return 4
-		if faction in [
-			'shadowcraft', 'ネクロマンサー', '死灵法师', '死靈法師', '死灵术士', '死灵', '死', '唤灵师',
-		]:
-			return 5
-		if faction in [
-			'bloodcraft', 'ヴァンパイア', '吸血鬼', '鬼', '血族', '暗夜伯爵',
-		]:
-			return 6
-		if faction in [
-			'havencraft', 'ビショップ', '主教', '教',
-		]:
-			return 7
-		if faction in [
-			'portalcraft', 'ネメシス', '复仇者', '復仇者', '超越者', '鱼',
-		]:
-			return 8
-		# cls._logger.error(f"unknow faction: {faction}")
-		return -1
+		return cls._get_code('faction', faction)
 
 	@classmethod
 	def get_type_code(cls, type: str) -> int:
-		if type in [
-			'followers', 'follower', 'フォロワー', '从者', '随从',
-		]:
-			return 0
-		if type in [
-			'spells', 'spell', 'スペル', '法术',
-		]:
-			return 1
-		if type in [
-			'amulets', 'amulet', 'アミュレット', '护符', '魔法阵',
-		]:
-			return 2
-		# cls._logger.error(f"unknow type: {type}")
-		return -1
+		return cls._get_code('type', type)
+
+	@classmethod
+	def set_std_card_codes(cls, card: TypeStdCard) -> TypeStdCard:
+		types = card.get('types') or ['']
+		card['rarity_code'] = cls.get_rarity_code(card.get('rarity'))
+		card['faction_code'] = cls.get_faction_code(card.get('faction'))
+		card['type_code'] = cls.get_type_code(types[0])
+		return card
 
 	@classmethod
 	def get_series_code(cls, series: str) -> int:
@@ -176,29 +392,32 @@ class BaseEngine():
 
 	@classmethod
 	async def get_all_std_cards(cls) -> List[TypeStdCard]:
-		return copy.deepcopy(await cls._get_std_data())
+		return list(await cls._get_std_data())
 
 	@classmethod
 	async def get_random_std_card(cls, cards: List[TypeStdCard]=None) -> TypeStdCard:
 		if cards == None:
-			return copy.deepcopy(random.choice(await cls._get_std_data()))
+			return random.choice(await cls._get_std_data())
 		else:
-			return copy.deepcopy(random.choice(cards))
+			return random.choice(cards)
 
 	@classmethod
 	async def get_random_std_cards(cls, n: int, cards: List[TypeStdCard]=None) -> List[TypeStdCard]:
 		if cards == None:
-			return copy.deepcopy(random.sample(await cls._get_std_data(), n))
+			return random.sample(await cls._get_std_data(), n)
 		else:
-			return copy.deepcopy(random.sample(cards, n))
+			return random.sample(cards, n)
 
 	# search ---------------------------
 
 	@classmethod
 	async def get_std_card_by_id(cls, id: str) -> TypeStdCard:
-		for card in await cls.get_all_std_cards():
-			if card.get('id') == id:
-				return card
+		return (await cls._get_std_index()).get_card_by_id(id)
+
+	@classmethod
+	async def get_std_cards_by_ids(cls, ids: List[str]) -> List[Union[TypeStdCard, type(None)]]:
+		# None for unknown ids, e.g. svgdb alts_ and tokens_ of other engines
+		return (await cls._get_std_index()).get_cards_by_ids(ids)
 
 	PUNCTUATION = (
 		# Chinese
@@ -236,20 +455,26 @@ class BaseEngine():
 	)
 
 	@classmethod
-	def get_std_card_names_pattern(cls, card: TypeStdCard) -> re.Pattern:
-		patterns = [
-			''.join(map(
-				lambda x: '.?' if x in cls.IGNORED_CHARS_IN_NAME else x,
-				name.strip()
-			)) for name in card['names']
-		]
-		return re.compile('|'.join(patterns), flags=re.IGNORECASE)
+	def normalize_std_card_name(cls, text: str) -> str:
+		table = cls.__dict__.get('_name_translation')
+		if table == None:
+			table = cls._name_translation = str.maketrans('', '', cls.IGNORED_CHARS_IN_NAME)
+		return text.translate(table).casefold()
+
+	@classmethod
+	def get_std_card_names_matcher(cls, card: TypeStdCard) -> 'NameMatcher':
+		key = (cls, tuple(card['names']))
+		matcher = name_matchers.get(key)
+		if matcher == None:
+			matcher = NameMatcher(cls.normalize_std_card_name, card['names'])
+			name_matchers.put(key, matcher)
+		return matcher
 
 	@classmethod
 	def filter_std_cards(cls, cards: List[TypeStdCard], f: str) -> List[TypeStdCard]:
 		cls._logger.debug(f"filter \"{f}\" in {len(cards)} cards")
 		if f == '':
-			return copy.deepcopy(cards)
+			return list(cards)
 		result = []
 		cost_match = re.match(r'^(\d+)(?:00|费)$', f)
 		if cost_match:
@@ -263,37 +488,79 @@ class BaseEngine():
 				lambda card: ''.join(map(str, card.get('attributes', ()))) == f,
 				cards
 			))
+		elif index.parse_range(f):
+			column, lo, hi = index.parse_range(f)
+			for card in cards:
+				value = index.get_column_value(card, column)
+				if (value != None and (lo == None or value >= lo) and
+					(hi == None or value <= hi)):
+					result.append(card)
 		else:
+			type_code = cls.get_type_code(f)
+			faction_code = cls.get_faction_code(f)
+			rarity_code = cls.get_rarity_code(f)
 			for card in cards:
 				if (any(map(lambda x: f in x, card.get('names', []))) or
 					any(map(lambda x: f in x, card.get('rules', []))) or
 					any(map(lambda x: f in x, card.get('types', []))) or
-					cls.check_code_equal(
-						cls.get_type_code(card.get('types')[0]),
-						cls.get_type_code(f)
-					) or
+					cls.check_code_equal(card.get('type_code', -1), type_code) or
 					card.get('faction') == f or
-					cls.check_code_equal(
-						cls.get_faction_code(card.get('faction')),
-						cls.get_faction_code(f)
-					) or
+					cls.check_code_equal(card.get('faction_code', -1), faction_code) or
 					card.get('series') == f or
 					card.get('rarity') == f or
-					cls.check_code_equal(
-						cls.get_rarity_code(card.get('rarity')),
-						cls.get_rarity_code(f)
-					)):
+					cls.check_code_equal(card.get('rarity_code', -1), rarity_code)):
 					result.append(card)
 		cls._logger.debug(f"find {len(result)} cards")
-		# return copy.deepcopy(result)
 		return result
 
+	# can override, misspelled names fall back to the closest names
+	SEARCH_FUZZY = True
+	# can override, counted in cached card positions
+	SEARCH_CACHE_SIZE = 256 * 1024
+
+	@classmethod
+	def _get_search_cache(cls) -> cache.MemoryCache:
+		search_cache = cls.__dict__.get('_search_cache')
+		if search_cache == None:
+			search_cache = cls._search_cache = cache.MemoryCache(
+				cls.SEARCH_CACHE_SIZE,
+				sizeof=lambda x: len(x) + 1
+			)
+		return search_cache
+
 	@classmethod
-	async def search_std_cards(cls, filters: List[str]) -> List[TypeStdCard]:
-		cards = await cls._get_std_data()
-		for f in filters:
-			cards = cls.filter_std_cards(cards, f)
-		return copy.deepcopy(cards)
+	def get_search_cache_stats(cls) -> Dict[str, int]:
+		search_cache = cls._get_search_cache()
+		return {
+			'hits':   search_cache.hits,
+			'misses': search_cache.misses,
+			'size':   len(search_cache),
+		}
+
+	@classmethod
+	async def search_std_cards(cls, filters: List[str], ranked: int=0) -> List[TypeStdCard]:
+		# the first `ranked` cards are the most relevant by name, the rest keep dataset order
+		std_index = await cls._get_std_index()
+		# keywords are and-ed, so their order and repetition do not matter
+		key = (cls, std_index.version, tuple(sorted(set(f.strip() for f in filters))), ranked)
+		search_cache = cls._get_search_cache()
+		positions = search_cache.get(key)
+		hit = positions != None
+		if not hit:
+			cls._logger.debug(f"search {filters} in {len(std_index)} cards")
+			plan = std_index.plan(key[2])
+			cls._logger.debug(f"plan: {' -> '.join(f'{f!r}~{n}' for f, n in plan)}")
+			positions = std_index.execute(plan, fuzzy=cls.SEARCH_FUZZY)
+			positions = array.array('I', std_index.rank(positions, key[2], ranked))
+			search_cache.put(key, positions)
+		stats = cls.get_search_cache_stats()
+		cls._logger.info(
+			f"search cache {'hit' if hit else 'miss'}: "
+			f"[{stats['hits']}] hits, [{stats['misses']}] misses, [{stats['size']}] entries"
+		)
+		cards = std_index.get_cards(positions)
+		cls._logger.debug(f"find {len(cards)} cards")
+		return cards
 
 	# net ------------------------------
 
@@ -301,18 +568,51 @@ class BaseEngine():
 		'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:91.0) Gecko/20100101 Firefox/91.0',
 	}
 
+	VALIDATOR_HEADERS = (
+		('ETag',          'If-None-Match'),
+		('Last-Modified', 'If-Modified-Since'),
+	)
+
+	@classmethod
+	def _get_conditional_headers(cls, validators: Dict[str, str]) -> Dict[str, str]:
+		return {
+			request_header: validators[response_header]
+			for response_header, request_header in cls.VALIDATOR_HEADERS
+			if validators.get(response_header)
+		}
+
+	@classmethod
+	def _update_validators(cls, validators: Dict[str, str], response: aiohttp.ClientResponse) -> NoReturn:
+		validators.clear()
+		for response_header, _ in cls.VALIDATOR_HEADERS:
+			if response.headers.get(response_header):
+				validators[response_header] = response.headers[response_header]
+
+	# can override
+	SESSION_CONFIG = {}
+
+	@classmethod
+	def _get_session(cls) -> aiohttp.ClientSession:
+		# one pooled keep-alive session per engine, closed on bot shutdown
+		return sessions.pool.get(cls, cls.SESSION_CONFIG)
+
 	@classmethod
 	async def _get_url_data(cls, url: str, **kwargs) -> bytes:
+		key = (cls, 'GET data', url, repr(sorted(kwargs.items())))
+		return await flights.do(key, cls._request_url_data, url, **kwargs)
+
+	@classmethod
+	async def _request_url_data(cls, url: str, **kwargs) -> bytes:
 		cls._logger.info(f"GET data: {url}")
 		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
-		async with aiohttp.ClientSession() as session:
-			try:
-				async with session.get(url, **kwargs) as response:
-					ret = await response.read()
-			except Exception as e:
-				cls._logger.error(f"{e}")
-				cls._logger.error(f"GET data: {url} failed")
-				raise
+		session = cls._get_session()
+		try:
+			async with session.get(url, **kwargs) as response:
+				ret = await response.read()
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"GET data: {url} failed")
+			raise
 		cls._logger.info(f"GET data: {url} succeed")
 		return ret
 
@@ -320,29 +620,87 @@ class BaseEngine():
 	async def _get_url_text(cls, url: str, **kwargs) -> str:
 		cls._logger.info(f"GET text: {url}")
 		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
-		async with aiohttp.ClientSession() as session:
-			try:
-				async with session.get(url, **kwargs) as response:
-					ret = await response.text()
-			except Exception as e:
-				cls._logger.error(f"{e}")
-				cls._logger.error(f"GET text: {url} failed")
-				raise
+		session = cls._get_session()
+		try:
+			async with session.get(url, **kwargs) as response:
+				ret = await response.text()
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"GET text: {url} failed")
+			raise
 		cls._logger.info(f"GET text: {url} succeed")
 		return ret
 
 	@classmethod
-	async def _get_url_json(cls, url: str, **kwargs) -> Union[List, Dict]:
+	async def _get_url_json_items(cls, url: str, callback: Callable[[str, Any], Any], validators: Dict[str, str]=None, chunk_size: int=65536, **kwargs) -> bool:
+		# call callback(key, value) for each member of a top level json object as it arrives
+		# return False if validators are given and upstream is not modified
+		cls._logger.info(f"GET json items: {url}")
+		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
+		if validators != None:
+			kwargs['headers'] = {**kwargs['headers'], **cls._get_conditional_headers(validators)}
+		session = cls._get_session()
+		decoder = jsonstream.ObjectItemsDecoder()
+		count = 0
+		try:
+			async with session.get(url, **kwargs) as response:
+				if validators != None and response.status == 304:
+					cls._logger.info(f"GET json items: {url} not modified")
+					return False
+				response.raise_for_status()
+				async for chunk in response.content.iter_chunked(chunk_size):
+					for key, value in decoder.feed(chunk):
+						callback(key, value)
+						count += 1
+				for key, value in decoder.close():
+					callback(key, value)
+					count += 1
+				if validators != None:
+					cls._update_validators(validators, response)
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"GET json items: {url} failed")
+			raise
+		cls._logger.info(f"GET json items: {url} [{count}] succeed")
+		return True
+
+	@classmethod
+	async def _iter_url_chunks(cls, url: str, chunk_size: int=16384, **kwargs) -> AsyncGenerator[bytes, None]:
+		# stop iterating early to drop the rest of the response
+		cls._logger.info(f"GET chunks: {url}")
+		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
+		session = cls._get_session()
+		try:
+			async with session.get(url, **kwargs) as response:
+				# an error page must not be parsed as an empty result
+				response.raise_for_status()
+				async for chunk in response.content.iter_chunked(chunk_size):
+					yield chunk
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"GET chunks: {url} failed")
+			raise
+		cls._logger.info(f"GET chunks: {url} succeed")
+
+	@classmethod
+	async def _get_url_json(cls, url: str, validators: Dict[str, str]=None, **kwargs) -> Union[List, Dict, type(None)]:
 		cls._logger.info(f"GET json: {url}")
 		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
-		async with aiohttp.ClientSession() as session:
-			try:
-				async with session.get(url, **kwargs) as response:
-					ret = await response.json(content_type=None)
-			except Exception as e:
-				cls._logger.error(f"{e}")
-				cls._logger.error(f"GET json: {url} failed")
-				raise
+		if validators != None:
+			kwargs['headers'] = {**kwargs['headers'], **cls._get_conditional_headers(validators)}
+		session = cls._get_session()
+		try:
+			async with session.get(url, **kwargs) as response:
+				if validators != None and response.status == 304:
+					cls._logger.info(f"GET json: {url} not modified")
+					return None
+				ret = await response.json(content_type=None)
+				if validators != None:
+					cls._update_validators(validators, response)
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"GET json: {url} failed")
+			raise
 		cls._logger.info(f"GET json: {url} succeed")
 		return ret
 
@@ -350,14 +708,14 @@ class BaseEngine():
 	async def _post_url_data(cls, url: str, **kwargs) -> bytes:
 		cls._logger.info(f"POST data: {url}")
 		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
-		async with aiohttp.ClientSession() as session:
-			try:
-				async with session.post(url, **kwargs) as response:
-					ret = await response.read()
-			except Exception as e:
-				cls._logger.error(f"{e}")
-				cls._logger.error(f"POST data: {url} failed")
-				raise
+		session = cls._get_session()
+		try:
+			async with session.post(url, **kwargs) as response:
+				ret = await response.read()
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"POST data: {url} failed")
+			raise
 		cls._logger.info(f"POST data: {url} succeed")
 		return ret
 
@@ -365,108 +723,212 @@ class BaseEngine():
 	async def _post_url_text(cls, url: str, **kwargs) -> str:
 		cls._logger.info(f"POST text: {url}")
 		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
-		async with aiohttp.ClientSession() as session:
-			try:
-				async with session.post(url, **kwargs) as response:
-					ret = await response.text()
-			except Exception as e:
-				cls._logger.error(f"{e}")
-				cls._logger.error(f"POST text: {url} failed")
-				raise
+		session = cls._get_session()
+		try:
+			async with session.post(url, **kwargs) as response:
+				ret = await response.text()
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"POST text: {url} failed")
+			raise
 		cls._logger.info(f"POST text: {url} succeed")
 		return ret
 
 	@classmethod
-	async def _post_url_json(cls, url: str, **kwargs) -> Union[List, Dict]:
+	async def _post_url_json(cls, url: str, validators: Dict[str, str]=None, **kwargs) -> Union[List, Dict, type(None)]:
 		cls._logger.info(f"POST json: {url}")
 		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
-		async with aiohttp.ClientSession() as session:
-			try:
-				async with session.post(url, **kwargs) as response:
-					ret = await response.json(content_type=None)
-			except Exception as e:
-				cls._logger.error(f"{e}")
-				cls._logger.error(f"POST json: {url} failed")
-				raise
+		if validators != None:
+			kwargs['headers'] = {**kwargs['headers'], **cls._get_conditional_headers(validators)}
+		session = cls._get_session()
+		try:
+			async with session.post(url, **kwargs) as response:
+				if validators != None and response.status == 304:
+					cls._logger.info(f"POST json: {url} not modified")
+					return None
+				ret = await response.json(content_type=None)
+				if validators != None:
+					cls._update_validators(validators, response)
+		except Exception as e:
+			cls._logger.error(f"{e}")
+			cls._logger.error(f"POST json: {url} failed")
+			raise
 		cls._logger.info(f"POST json: {url} succeed")
 		return ret
 
+	# can override
+	FETCH_CONFIG = {
+		'limit_per_host': 4,
+		'timeout':        20,
+		'retries':        2,
+		'backoff':        0.5,
+	}
+
 	@classmethod
-	async def _get_urls_data(cls, urls: List[str], **kwargs) -> List[Union[bytes, type(None)]]:
-		# cls._logger.info(f"get urls: [{len(urls)}]")
-		cls._logger.info(f"GET data: {urls}")
-		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
-		async def fetch(session: aiohttp.client.ClientSession, url: str) -> bytes:
+	def _get_host_semaphore(cls, url: str) -> asyncio.Semaphore:
+		semaphores = cls.__dict__.get('_host_semaphores')
+		if semaphores == None:
+			semaphores = cls._host_semaphores = {}
+		host = urllib.parse.urlsplit(url).netloc
+		if host not in semaphores:
+			semaphores[host] = asyncio.Semaphore(cls.FETCH_CONFIG['limit_per_host'])
+		return semaphores[host]
+
+	@staticmethod
+	def _is_retryable(e: Exception) -> bool:
+		if isinstance(e, aiohttp.ClientResponseError):
+			return e.status >= 500 or e.status == 429
+		return isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError))
+
+	@classmethod
+	async def _fetch_url(cls, url: str, read: Callable[[aiohttp.ClientResponse], Awaitable], **kwargs) -> Any:
+		config = cls.FETCH_CONFIG
+		kwargs.setdefault('timeout', aiohttp.ClientTimeout(total=config['timeout']))
+		for attempt in itertools.count():
 			try:
-				async with session.get(url, **kwargs) as response:
-					return await response.read()
+				async with cls._get_host_semaphore(url):
+					async with cls._get_session().get(url, **kwargs) as response:
+						response.raise_for_status()
+						return await read(response)
 			except Exception as e:
-				cls._logger.error(f"{e}")
-				cls._logger.error(f"GET data: {url} failed")
-				return None
-		async with aiohttp.ClientSession() as session:
-			ret = await asyncio.gather(
-				*[fetch(session, url) for url in urls]
-			)
+				if attempt >= config['retries'] or not cls._is_retryable(e):
+					raise
+				cls._logger.warning(f"GET: {url} retry {attempt+1} ({e!r})")
+			# full jitter backoff
+			await asyncio.sleep(random.uniform(0, config['backoff'] * 2 ** attempt))
+
+	@classmethod
+	async def _iter_urls(cls, urls: List[str], read: Callable[[aiohttp.ClientResponse], Awaitable], flight: str=None, **kwargs) -> AsyncGenerator[Tuple[int, Any], None]:
+		# yield (position, result) as soon as each url completes, None if failed,
+		# concurrent fetches of the same url share one request when flight names what read returns
+		async def fetch(i: int, url: str) -> Tuple[int, Any]:
+			try:
+				if flight == None:
+					return (i, await cls._fetch_url(url, read, **kwargs))
+				key = (cls, flight, url, repr(sorted(kwargs.items())))
+				return (i, await flights.do(key, cls._fetch_url, url, read, **kwargs))
+			except Exception as e:
+				cls._logger.error(f"{e!r}")
+				cls._logger.error(f"GET: {url} failed")
+				return (i, None)
+		tasks = [asyncio.ensure_future(fetch(i, url)) for i, url in enumerate(urls)]
+		try:
+			for task in asyncio.as_completed(tasks):
+				yield await task
+		finally:
+			for task in tasks:
+				task.cancel()
+
+	@classmethod
+	async def _iter_urls_data(cls, urls: List[str], **kwargs) -> AsyncGenerator[Tuple[int, Union[bytes, type(None)]], None]:
+		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
+		async for item in cls._iter_urls(urls, lambda x: x.read(), flight='GET data', **kwargs):
+			yield item
+
+	@classmethod
+	async def _get_urls_data(cls, urls: List[str], **kwargs) -> List[Union[bytes, type(None)]]:
+		cls._logger.info(f"GET data: {urls}")
+		ret = [None] * len(urls)
+		async for i, data in cls._iter_urls_data(urls, **kwargs):
+			ret[i] = data
 		cls._logger.info(f"GET data: [{len(urls)-ret.count(None)}] succeed")
 		return ret
 
 	@classmethod
 	async def _get_urls_text(cls, urls: List[str], **kwargs) -> List[Union[str, type(None)]]:
-		# cls._logger.info(f"get urls: [{len(urls)}]")
 		cls._logger.info(f"GET text: {urls}")
 		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
-		async def fetch(session: aiohttp.client.ClientSession, url: str) -> bytes:
-			try:
-				async with session.get(url, **kwargs) as response:
-					return await response.text()
-			except Exception as e:
-				cls._logger.error(f"{e}")
-				cls._logger.error(f"GET text: {url} failed")
-				return None
-		async with aiohttp.ClientSession() as session:
-			ret = await asyncio.gather(
-				*[fetch(session, url) for url in urls]
-			)
+		ret = [None] * len(urls)
+		async for i, text in cls._iter_urls(urls, lambda x: x.text(), flight='GET text', **kwargs):
+			ret[i] = text
 		cls._logger.info(f"GET text: [{len(urls)-ret.count(None)}] succeed")
 		return ret
 
 	@classmethod
 	async def _get_urls_json(cls, urls: List[str], **kwargs) -> List[Union[List, Dict, type(None)]]:
-		# cls._logger.info(f"get urls: [{len(urls)}]")
 		cls._logger.info(f"GET json: {urls}")
 		kwargs.setdefault('headers', __class__.DEFAULT_HEADERS)
-		async def fetch(session: aiohttp.client.ClientSession, url: str) -> bytes:
-			try:
-				async with session.get(url, **kwargs) as response:
-					return await response.json(content_type=None)
-			except Exception as e:
-				cls._logger.error(f"{e}")
-				cls._logger.error(f"GET json: {url} failed")
-				return None
-		async with aiohttp.ClientSession() as session:
-			ret = await asyncio.gather(
-				*[fetch(session, url) for url in urls]
-			)
+		ret = [None] * len(urls)
+		async for i, data in cls._iter_urls(urls, lambda x: x.json(content_type=None), **kwargs):
+			ret[i] = data
 		cls._logger.info(f"GET json: [{len(urls)-ret.count(None)}] succeed")
 		return ret
 
 	# image ----------------------------
 
 	@classmethod
-	async def get_std_card_image(cls, card: TypeStdCard) -> PIL.Image.Image:
-		bytes = io.BytesIO(await cls._get_url_data(card['image']))
-		image = PIL.Image.open(bytes).convert("RGBA")
+	async def _get_image_data(cls, url: str) -> bytes:
+		data = await cache.images.get(url)
+		if data == None:
+			data = await cls._get_url_data(url, raise_for_status=True)
+			await cache.images.put(url, data)
+		return data
+
+	@classmethod
+	async def _iter_images_data(cls, urls: List[str]) -> AsyncGenerator[Tuple[int, Union[bytes, type(None)]], None]:
+		missed = []
+		for i, url in enumerate(urls):
+			data = await cache.images.get(url)
+			if data == None:
+				missed.append(i)
+			else:
+				yield (i, data)
+		if missed:
+			cls._logger.info(f"image cache: [{len(urls)-len(missed)}] hit, [{len(missed)}] miss")
+		async for j, data in cls._iter_urls_data([urls[i] for i in missed]):
+			if data:
+				await cache.images.put(urls[missed[j]], data)
+			yield (missed[j], data)
+
+	@classmethod
+	async def _decode_image(cls, key: str, data: bytes) -> PIL.Image.Image:
+		image = await workers.pool.run(render.decode_image, data)
+		decoded_images.put(key, image)
+		return image
+
+	@classmethod
+	async def _get_error_image(cls) -> PIL.Image.Image:
+		image = decoded_images.get('error.png')
+		if image == None:
+			image = await cls._decode_image('error.png', resource.images['error.png'])
 		return image
 
+	# decoded images are shared, pass mutable=True to get copies that can be changed in place
+
+	@classmethod
+	async def get_std_card_image(cls, card: TypeStdCard, mutable: bool=False) -> PIL.Image.Image:
+		image = decoded_images.get(card['image'])
+		if image == None:
+			image = await cls._decode_image(card['image'], await cls._get_image_data(card['image']))
+		return image.copy() if mutable else image
+
 	@classmethod
-	async def get_std_card_images(cls, cards: List[TypeStdCard]) -> List[PIL.Image.Image]:
-		images = [
-			PIL.Image.open(io.BytesIO(bytes)).convert("RGBA") if bytes else \
-				PIL.Image.open(io.BytesIO(resource.images['error.png'])).convert("RGBA") \
-				for bytes in await cls._get_urls_data([card['image'] for card in cards])
-		]
-		return images
+	async def get_std_card_images(cls, cards: List[TypeStdCard], mutable: bool=False) -> List[PIL.Image.Image]:
+		images, _ = await cls._get_std_card_images(cards)
+		return [image.copy() for image in images] if mutable else images
+
+	@classmethod
+	async def _get_std_card_images(cls, cards: List[TypeStdCard]) -> Tuple[List[PIL.Image.Image], List[int]]:
+		# (shared images, positions that fell back to the error image)
+		urls = [card['image'] for card in cards]
+		images = [decoded_images.get(url) for url in urls]
+		missed = [i for i, image in enumerate(images) if image == None]
+		# decode each image in the workers while the others are still downloading
+		async def decode(i: int, data: bytes) -> NoReturn:
+			try:
+				images[i] = await cls._decode_image(urls[i], data)
+			except Exception as e:
+				cls._logger.error(f"{e}")
+		decodes = []
+		async for j, data in cls._iter_images_data([urls[i] for i in missed]):
+			if data:
+				decodes.append(asyncio.create_task(decode(missed[j], data)))
+		await asyncio.gather(*decodes)
+		failed = [i for i, image in enumerate(images) if not image]
+		if failed:
+			error_image = await cls._get_error_image()
+			images = [image if image else error_image for image in images]
+		return (images, failed)
 
 	# can override
 	DEFAULT_IMAGE_CROP_CONFIG = {
@@ -478,60 +940,44 @@ class BaseEngine():
 	}
 
 	@classmethod
-	def get_std_card_image_crop(cls, image: PIL.Image.Image, config: TypeImageCropConfig=None) -> PIL.Image.Image:
+	def get_std_card_image_crop_box(cls, size: Tuple[int, int], config: TypeImageCropConfig=None) -> Tuple[int, int, int, int]:
 		if config == None:
 			config = cls.DEFAULT_IMAGE_CROP_CONFIG
-		x0 = int(image.size[0] * config['left'])
-		y0 = int(image.size[1] * config['top'])
-		ws = int(image.size[1] * config['wsize'])
-		x1 = int(image.size[0] * config['right']) - ws
-		y1 = int(image.size[1] * config['bottom']) - ws
+		x0 = int(size[0] * config['left'])
+		y0 = int(size[1] * config['top'])
+		ws = int(size[1] * config['wsize'])
+		x1 = int(size[0] * config['right']) - ws
+		y1 = int(size[1] * config['bottom']) - ws
 		x2 = random.randint(x0, x1)
 		y2 = random.randint(y0, y1)
-		return image.crop((x2, y2, x2 + ws, y2 + ws))
+		return (x2, y2, x2 + ws, y2 + ws)
 
-	@staticmethod
-	def _get_multiline_textsize(lines: List[str], font: PIL.ImageFont.FreeTypeFont, spacing: int=4) -> Tuple[int, int]:
-		sizes = [font.getsize(line) for line in lines]
-		return (max(sizes)[0], sum(list(zip(*sizes))[1])+spacing*(len(sizes)-1))
+	@classmethod
+	def get_std_card_image_crop(cls, image: PIL.Image.Image, config: TypeImageCropConfig=None) -> PIL.Image.Image:
+		return image.crop(cls.get_std_card_image_crop_box(image.size, config))
+
+	@classmethod
+	async def get_std_card_image_crop_data(cls, image: PIL.Image.Image, config: TypeImageCropConfig=None) -> bytes:
+		# the box is chosen here, worker processes would share the random state
+		box = cls.get_std_card_image_crop_box(image.size, config)
+		return await workers.pool.run(render.crop_image_data, image, box)
+
+	@classmethod
+	async def get_std_card_image_data(cls, card: TypeStdCard) -> bytes:
+		return await workers.pool.run(render.encode_image, await cls.get_std_card_image(card))
 
 	@staticmethod
 	def _make_text_lines(card: TypeStdCard, line_size_max: int=40) -> List[str]:
 
-		def utf8_size(text: str) -> int:
-			return int((len(text.encode('UTF-8'))-len(text))/2+len(text))
-
 		def cut(text: str, line_size_max: int) -> List[str]:
-			SEPEND = r'[；，。！」]'
-			SEP = [
-				' ', '，', '、', '；', '—', '……',
-				f'。(?!{SEPEND})', f'！(?!{SEPEND})',
-				'(?<!^)(?=（)', f'）(?!{SEPEND})',
-				'(?<!^)(?=「)', f'」(?!{SEPEND})',
-				# '(?<=<br>)',
-			]
-			result = []
-			size = utf8_size(text)
-			while size > line_size_max:
-				seps = list(itertools.chain.from_iterable(map(
-					lambda x: [i.end() for i in re.finditer(x, text)],
-					SEP
-				))) + [len(text)]
-				# assert all([i > 0 for i in seps])
-				fragment = min([(abs(utf8_size(text[:i])-line_size_max), i) for i in seps])
-				result.append(text[:fragment[1]])
-				text = text[fragment[1]:]
-				size = utf8_size(text)
-			if text:
-				result.append(text)
-			return result
+			return layout.break_line(text, line_size_max)
 
 		result = []
 		result.extend(card['names'])
 		result.append(' ')
 		result.append(card['series'])
 		result.append(' ')
-		result.append('/'.join([card['faction']]+card['types']))
+		result.append('/'.join([card['faction'], *card['types']]))
 		result.append('-' * line_size_max)
 		result.append(f"{card['attributes']}")
 		result.append(' ')
@@ -555,94 +1001,141 @@ class BaseEngine():
 		return result
 
 	@classmethod
-	async def generate_std_cards_info_image(cls, cards: List[TypeStdCard], config: TypeImagesInfoConfig) -> PIL.Image.Image:
+	def _get_text_lines(cls, card: TypeStdCard, line_size_max: int=40) -> List[str]:
+		key = (cls, card['id'], line_size_max)
+		entry = text_layouts.get(key)
+		# the card object changes when the data is refreshed
+		if entry == None or entry[0] is not card:
+			entry = (card, tuple(cls._make_text_lines(card, line_size_max)))
+			text_layouts.put(key, entry)
+		return list(entry[1])
 
-		cards = cards[:config['count_max']]
-		font = PIL.ImageFont.truetype(
-			font=config['font'],
-			size=config['font_size'],
-			index=0,
-			encoding='unic',
-			layout_engine=None
-		)
-
-		card_images = await cls.get_std_card_images(cards)
-		card_width_min = min(map(lambda x: x.size[0], card_images))
+	INFO_IMAGE_CONFIG_KEYS = ('font', 'font_size', 'font_spacing', 'count_max', 'line_size_max', 'card_margin')
 
-		text_sections = []
-		text_sizes = []
+	@classmethod
+	async def _get_std_cards_info(cls, cards: List[TypeStdCard], config: TypeImagesInfoConfig) -> Tuple[List[PIL.Image.Image], List[List[str]], Dict, List[int]]:
+		# everything the workers need to render, the config keeps only what they use,
+		# and the positions of the images that fell back to the error image
+		cards = cards[:config['count_max']]
+		card_images, failed = await cls._get_std_card_images(cards)
+		text_sections = [cls._get_text_lines(card, config['line_size_max']) for card in cards]
+		return (card_images, text_sections, {k: config[k] for k in cls.INFO_IMAGE_CONFIG_KEYS}, failed)
 
-		for card in cards:
-			text_lines = cls._make_text_lines(card, config['line_size_max'])
-			text_size = cls._get_multiline_textsize(text_lines, font, config['font_spacing'])
-			text_sections.append(text_lines)
-			text_sizes.append(text_size)
-
-		for card_image in card_images:
-			card_image = card_image.thumbnail((card_width_min, card_image.size[1]), PIL.Image.ANTIALIAS)
-
-		card_width_max = card_width_min
-		card_margin = config['card_margin']
-
-		image_size = (
-			max(map(
-				lambda i: card_images[i].size[0] + text_sizes[i][0],
-				range(len(cards))
-			)) + card_margin * 3,
-			sum(map(
-				lambda i: max(card_images[i].size[1], text_sizes[i][1]),
-				range(len(cards))
-			)) + card_margin * (len(cards) + 1)
-		)
+	@classmethod
+	async def generate_std_cards_info_image(cls, cards: List[TypeStdCard], config: TypeImagesInfoConfig) -> PIL.Image.Image:
+		card_images, text_sections, render_config, _ = await cls._get_std_cards_info(cards, config)
+		return await workers.pool.run(render.render_cards_info, card_images, text_sections, render_config)
 
-		image = PIL.Image.new(mode='RGBA', size=image_size, color='white')
-		draw = PIL.ImageDraw.Draw(image)
-
-		section_top = card_margin
-		for i in range(len(cards)):
-			section_height = max(card_images[i].size[1], text_sizes[i][1])
-			image.paste(
-				im=card_images[i],
-				box=(
-					int((card_width_max-card_images[i].size[0])/2) + card_margin,
-					int((section_height-card_images[i].size[1])/2) + section_top,
-				),
-				mask=card_images[i]
-			)
-			text_size = text_sizes[i]
-			top = section_top + int((section_height-text_size[1])/2)
-			left = card_width_max + card_margin * 2
-			text_lines = text_sections[i]
-			for text_line in text_lines:
-				line_size = font.getsize(text_line)
-				draw.text(
-					xy=(left, top),
-					text=text_line,
-					fill='black',
-					font=font,
-					anchor='la',
-					spacing=0,
-					align='left',
-					# direction=None,
-					# features=None,
-					# language=None,
-					stroke_width=0,
-					stroke_fill=None,
-					embedded_color=False
-				)
-				top += line_size[1] + config['font_spacing']
-			section_top += section_height + card_margin
-
-		any(map(lambda x: x.close(), card_images))
+	@classmethod
+	async def get_std_cards_info_image_data(cls, cards: List[TypeStdCard], config: TypeImagesInfoConfig) -> bytes:
+		# png encoded, repeated queries are served from the disk cache
+		std_index = await cls._get_std_index()
+		key = json.dumps([
+			cls.SOURCE,
+			std_index.digest,
+			[card['id'] for card in cards[:config['count_max']]],
+			[config[k] for k in cls.INFO_IMAGE_CONFIG_KEYS],
+		], ensure_ascii=False)
+		data = await cache.info_images.get(key)
+		if data != None:
+			cls._logger.info(f"info image cache hit")
+			return data
+		# the same query sent at once is rendered once
+		return await flights.do((cls, 'info image', key), cls._render_std_cards_info_image_data, key, cards, config)
 
-		return image
+	@classmethod
+	async def _render_std_cards_info_image_data(cls, key: str, cards: List[TypeStdCard], config: TypeImagesInfoConfig) -> bytes:
+		card_images, text_sections, render_config, failed = await cls._get_std_cards_info(cards, config)
+		data = await workers.pool.run(render.render_cards_info_data, card_images, text_sections, render_config)
+		if failed:
+			# a placeholder must not be served again, the next query retries the downloads
+			cls._logger.info(f"info image not cached, [{len(failed)}] card images failed")
+		else:
+			await cache.info_images.put(key, data)
+		return data
 
 	# voice ----------------------------
 
+	# can override
+	VOICE_MANIFEST_TTL = 86400 * 7
+	VOICE_MANIFEST_SAVE_INTERVAL = 20
+
 	@abc.abstractclassmethod
-	async def get_std_card_voices(cls, card: TypeStdCard) -> TypeStdCardVoices:
+	async def _fetch_std_card_voices(cls, card: TypeStdCard) -> TypeStdCardVoices:
 		raise NotImplementedError
 
+	@classmethod
+	def _get_voice_manifest(cls) -> cache.JsonStore:
+		return cache.get_voice_manifest(cls.SOURCE, cls.VOICE_MANIFEST_TTL)
+
+	@classmethod
+	async def get_std_card_voices(cls, card: TypeStdCard) -> TypeStdCardVoices:
+		manifest = cls._get_voice_manifest()
+		voices = await manifest.get(card['id'])
+		if voices == None:
+			voices = await cls._fetch_std_card_voices(card)
+			# saved in batches, the rest is saved when the bot stops
+			await manifest.set(card['id'], voices)
+			if manifest.dirty >= cls.VOICE_MANIFEST_SAVE_INTERVAL:
+				await manifest.save()
+		else:
+			cls._logger.info(f"voice manifest hit: {card['id']}")
+		return voices
+
+	# can override
+	VOICE_CRAWL_CONCURRENCY = 4
+	VOICE_CRAWL_SAVE_INTERVAL = 100
+
+	@classmethod
+	async def crawl_std_card_voices(cls, cards: List[TypeStdCard]=None, force: bool=False) -> Tuple[int, int]:
+		# build the voice manifest ahead of games, return (crawled, failed)
+		if cards == None:
+			cards = await cls._get_std_data()
+		manifest = cls._get_voice_manifest()
+		known = set() if force else set(await manifest.keys())
+		cards = [card for card in cards if card['id'] not in known]
+		cls._logger.info(f"crawl voices of {len(cards)} cards")
+		semaphore = asyncio.Semaphore(cls.VOICE_CRAWL_CONCURRENCY)
+		failed = []
+		done = []
+
+		async def crawl(card: TypeStdCard) -> NoReturn:
+			async with semaphore:
+				try:
+					voices = await cls._fetch_std_card_voices(card)
+				except NotImplementedError:
+					raise
+				except Exception as e:
+					cls._logger.error(f"{e}")
+					cls._logger.error(f"crawl voices of {card['id']} failed")
+					failed.append(card['id'])
+					return
+				await manifest.set(card['id'], voices)
+				done.append(card['id'])
+				if len(done) % cls.VOICE_CRAWL_SAVE_INTERVAL == 0:
+					await manifest.save()
+
+		try:
+			await asyncio.gather(*[crawl(card) for card in cards])
+		finally:
+			await manifest.save()
+		cls._logger.info(f"crawl voices: [{len(done)}] succeed, [{len(failed)}] failed")
+		return (len(done), len(failed))
+
+	@classmethod
+	async def filter_std_cards_with_voices(cls, cards: List[TypeStdCard]) -> List[TypeStdCard]:
+		# drop only the cards known to have no voices, the manifest may cover just a few cards
+		manifest = cls._get_voice_manifest()
+		result = []
+		for card in cards:
+			if await manifest.get(card['id']) != []:
+				result.append(card)
+		return result
+
 	@classmethod
 	async def get_std_card_voice(cls, voice: TypeStdCardVoice) -> bytes:
-		return await cls._get_url_data(voice['voice'])
+		data = await cache.voices.get(voice['voice'])
+		if data == None:
+			data = await cls._get_url_data(voice['voice'], raise_for_status=True)
+			await cache.voices.put(voice['voice'], data)
+		return data
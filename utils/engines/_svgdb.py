@@ -41,10 +41,18 @@ class svgdb(base.BaseEngine):
 	}
 
 	@classmethod
-	async def _fetch_data(cls) -> Dict[str, TypeSVGCard]:
+	async def _fetch_data(cls, validators: Dict[str, str]=None) -> Dict[str, TypeSVGCard]:
 		cls._logger.info(f"fetch data")
 		headers = cls.DEFAULT_HEADERS
-		ret = await cls._get_url_json(cls.URL, headers=headers)
+		ret = await cls._get_url_json(cls.URL, validators=validators, headers=headers)
+		cls._logger.info(f"fetch data succeed")
+		return ret
+
+	@classmethod
+	async def _fetch_std_cards(cls, validators: Dict[str, str]=None) -> List[base.TypeStdCard]:
+		cls._logger.info(f"fetch data")
+		headers = cls.DEFAULT_HEADERS
+		ret = await cls._stream_std_cards(cls.URL, validators=validators, headers=headers)
 		cls._logger.info(f"fetch data succeed")
 		return ret
 
@@ -134,7 +142,7 @@ class svgdb(base.BaseEngine):
 		return ret
 
 	@classmethod
-	async def get_std_card_voices(cls, card: base.TypeStdCard) -> base.TypeStdCardVoices:
+	async def _fetch_std_card_voices(cls, card: base.TypeStdCard) -> base.TypeStdCardVoices:
 		svg_voices = await cls.get_svg_card_voices(card)
 		svg_voices = [(k, v) for k in svg_voices for v in svg_voices[k]]
 		std_voices = []
@@ -79,7 +79,7 @@ class iyingdi(base.BaseEngine):
 	_logger = log.new_logger(_logger_name, config.DEBUG)
 
 	@classmethod
-	async def _fetch_data(cls) -> TypeIyingdiCards:
+	async def _fetch_data(cls, validators: Dict[str, str]=None) -> TypeIyingdiCards:
 		cls._logger.info(f"fetch data")
 		headers = cls.DEFAULT_HEADERS
 		data = {
@@ -90,7 +90,10 @@ class iyingdi(base.BaseEngine):
 			'collect':   '0',
 			'envolve':   '0',
 		}
-		ret = await cls._post_url_json(cls.URL, headers=headers, data=data)
+		ret = await cls._post_url_json(cls.URL, validators=validators, headers=headers, data=data)
+		if ret == None:
+			cls._logger.info(f"fetch data not modified")
+			return None
 		if ret.get('success', False):
 			cls._logger.info(f"fetch data succeed")
 			return ret.get('data', {}).get('cards', [])
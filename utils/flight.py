@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Any, Hashable, Callable, Awaitable, Dict
+
+import asyncio
+
+class SingleFlight():
+
+	def __init__(self):
+		self._futures: Dict[Hashable, asyncio.Future] = {}
+
+	def __contains__(self, key: Hashable) -> bool:
+		return key in self._futures
+
+	def _done(self, key: Hashable, future: asyncio.Future):
+		if self._futures.get(key) is future:
+			del self._futures[key]
+		if not future.cancelled():
+			# mark as retrieved even if every caller has gone
+			future.exception()
+
+	async def do(self, key: Hashable, func: Callable[..., Awaitable], *args, **kwargs) -> Any:
+		future = self._futures.get(key)
+		if future == None:
+			future = asyncio.ensure_future(func(*args, **kwargs))
+			self._futures[key] = future
+			future.add_done_callback(lambda x: self._done(key, x))
+		# a cancelled caller must not cancel the others
+		return await asyncio.shield(future)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Tuple, Dict
+
+import os
+import threading
+import PIL.ImageFont
+
+_fonts: Dict[Tuple[str, int, int], PIL.ImageFont.FreeTypeFont] = {}
+_lock = threading.Lock()
+
+def get_font(path: str, size: int, index: int=0) -> PIL.ImageFont.FreeTypeFont:
+	# fonts are parsed once per process and shared by every service
+	key = (os.path.realpath(path), size, index)
+	font = _fonts.get(key)
+	if font == None:
+		with _lock:
+			font = _fonts.get(key)
+			if font == None:
+				font = PIL.ImageFont.truetype(
+					font=path,
+					size=size,
+					index=index,
+					encoding='unic',
+					layout_engine=None
+				)
+				_fonts[key] = font
+	return font
+
+_font_locks: Dict[PIL.ImageFont.FreeTypeFont, threading.Lock] = {}
+
+def get_font_lock(font: PIL.ImageFont.FreeTypeFont) -> threading.Lock:
+	# held while a font measures or draws, workers share the pooled fonts
+	lock = _font_locks.get(font)
+	if lock == None:
+		with _lock:
+			lock = _font_locks.setdefault(font, threading.Lock())
+	return lock
+
+def preload_font(path: str, size: int, index: int=0) -> bool:
+	try:
+		get_font(path, size, index)
+		return True
+	except OSError:
+		return False
+
+class FontMetrics():
+
+	# sizes measured once per character, lines are summed from them
+	def __init__(self, font: PIL.ImageFont.FreeTypeFont):
+		self._font = font
+		self._sizes: Dict[str, Tuple[int, int]] = {}
+
+	def get_char_size(self, char: str) -> Tuple[int, int]:
+		size = self._sizes.get(char)
+		if size == None:
+			size = self._sizes[char] = self._font.getsize(char)
+		return size
+
+	def get_size(self, text: str) -> Tuple[int, int]:
+		width = 0
+		height = 0
+		for char in text:
+			size = self._sizes.get(char) or self.get_char_size(char)
+			width += size[0]
+			if size[1] > height:
+				height = size[1]
+		return (width, height)
+
+_metrics: Dict[PIL.ImageFont.FreeTypeFont, FontMetrics] = {}
+
+def get_font_metrics(font: PIL.ImageFont.FreeTypeFont) -> FontMetrics:
+	metrics = _metrics.get(font)
+	if metrics == None:
+		metrics = _metrics.setdefault(font, FontMetrics(font))
+	return metrics
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Any, Union, Iterable, Sequence, Tuple, List, Dict, Set
+
+import re
+import array
+import bisect
+import heapq
+import itertools
+import hashlib
+import pickle
+import collections
+
+PATTERN_COST = re.compile(r'^(\d+)(?:00|费)$')
+PATTERN_STATS = re.compile(r'^\d+$')
+
+COLUMN_ALIASES = {
+	'cost': ['费用', '费', 'cost', 'pp'],
+	'atk':  ['攻击力', '攻击', '攻', 'atk'],
+	'def':  ['体力', '生命', '血量', '血', '体', 'def', 'hp'],
+}
+COLUMN_EVO_ALIASES = ['进化后', '进化', 'evo']
+
+_column = '|'.join(sorted(
+	(alias for aliases in COLUMN_ALIASES.values() for alias in aliases),
+	key=len, reverse=True
+))
+_evo = '|'.join(COLUMN_EVO_ALIASES)
+PATTERN_COMPARE = re.compile(
+	rf'^(?P<evo>{_evo})?(?P<column>{_column})(?P<op>>=|<=|==|>|<|=)(?P<value>\d+)$',
+	flags=re.IGNORECASE
+)
+PATTERN_RANGE = re.compile(
+	rf'^(?P<evo>{_evo})?(?P<prefix>{_column})?(?P<lo>\d+)[-~](?P<hi>\d+)(?P<suffix>{_column})?$',
+	flags=re.IGNORECASE
+)
+FULLWIDTH_OPERATORS = str.maketrans('＞＜＝～', '><=~')
+
+BITSET_CACHE_SIZE = 4096
+
+NAME_GRAM_PAD = ('\x02\x02', '\x03')
+FUZZY_THRESHOLD = 0.3
+FUZZY_LIMIT = 50
+
+# relevance bonus of a name keyword, on top of its trigram similarity
+RANK_EXACT = 3.0
+RANK_PREFIX = 2.0
+RANK_CONTAIN = 1.0
+
+COLUMNS = {
+	'cost':    lambda card: card['attributes'][0],
+	'atk':     lambda card: card['attributes'][1],
+	'def':     lambda card: card['attributes'][2],
+	'evo_atk': lambda card: card['evo_attributes'][1],
+	'evo_def': lambda card: card['evo_attributes'][2],
+}
+
+def get_column_name(alias: str, evo: bool) -> str:
+	alias = alias.lower()
+	name = next(k for k, v in COLUMN_ALIASES.items() if alias in v)
+	return f"evo_{name}" if evo and name != 'cost' else name
+
+def parse_range(f: str) -> Union[Tuple[str, int, int], type(None)]:
+	# '3-5费', '攻>=4', '进化血<3' -> (column, lo, hi), bounds are inclusive, None for open
+	f = f.translate(FULLWIDTH_OPERATORS)
+	m = PATTERN_COMPARE.match(f)
+	if m:
+		column = get_column_name(m.group('column'), bool(m.group('evo')))
+		value = int(m.group('value'))
+		return {
+			'>=': (column, value, None),
+			'<=': (column, None, value),
+			'>':  (column, value + 1, None),
+			'<':  (column, None, value - 1),
+			'=':  (column, value, value),
+			'==': (column, value, value),
+		}[m.group('op')]
+	m = PATTERN_RANGE.match(f)
+	if m and bool(m.group('prefix')) != bool(m.group('suffix')):
+		column = get_column_name(m.group('prefix') or m.group('suffix'), bool(m.group('evo')))
+		lo, hi = sorted((int(m.group('lo')), int(m.group('hi'))))
+		return (column, lo, hi)
+	return None
+
+def get_column_value(card: Dict, column: str) -> Union[int, type(None)]:
+	try:
+		return int(COLUMNS[column](card))
+	except (LookupError, TypeError, ValueError):
+		return None
+
+class NumericColumn():
+
+	# values sorted with their card positions, ranges resolve by bisect
+	def __init__(self, cards: List[Dict], column: str):
+		pairs = sorted(
+			(value, i) for i, value in enumerate(
+				get_column_value(card, column) for card in cards
+			) if value != None
+		)
+		self._values = array.array('i', [value for value, _ in pairs])
+		self._positions = array.array('I', [i for _, i in pairs])
+
+	def __len__(self) -> int:
+		return len(self._values)
+
+	def range(self, lo: int=None, hi: int=None) -> array.array:
+		left = 0 if lo == None else bisect.bisect_left(self._values, lo)
+		right = len(self._values) if hi == None else bisect.bisect_right(self._values, hi)
+		return self._positions[left:right]
+
+def make_grams(text: str) -> Set[str]:
+	grams = set(text)
+	grams.update(text[i:i+2] for i in range(len(text)-1))
+	return grams
+
+def make_name_grams(name: str) -> Set[str]:
+	# padded trigrams, so short names and name edges still have grams
+	name = NAME_GRAM_PAD[0] + name + NAME_GRAM_PAD[1]
+	return {name[i:i+3] for i in range(len(name)-2)}
+
+def from_bitset(bitset: int) -> List[int]:
+	result = []
+	for i, byte in enumerate(bitset.to_bytes((bitset.bit_length() + 7) // 8, 'little')):
+		while byte:
+			low = byte & -byte
+			result.append((i << 3) + low.bit_length() - 1)
+			byte ^= low
+	return result
+
+def to_postings(positions: Dict[Any, List[int]]) -> Dict[Any, array.array]:
+	return {k: array.array('I', v) for k, v in positions.items()}
+
+_versions = itertools.count(1)
+
+class StdCardIndex():
+
+	def __init__(self, cards: List[Dict], engine: Any, time: float=0, validators: Dict[str, str]={}):
+		self.cards = cards
+		# unique per built index, anything derived from the cards can be keyed by it
+		self.version = next(_versions)
+		self.time = time
+		self.validators = dict(validators)
+		self._engine = engine
+		self._build()
+		# stable across restarts unlike version, for keys that are persisted
+		self.digest = hashlib.sha1(
+			pickle.dumps(list(self.cards), protocol=pickle.HIGHEST_PROTOCOL)
+		).hexdigest()
+
+	def __len__(self) -> int:
+		return len(self.cards)
+
+	@staticmethod
+	def _get_texts(card: Dict) -> List[str]:
+		return [
+			text for key in ('names', 'rules', 'types')
+			for text in card.get(key) or [] if isinstance(text, str)
+		]
+
+	def _build(self):
+		grams = collections.defaultdict(list)
+		costs = collections.defaultdict(list)
+		stats = collections.defaultdict(list)
+		type_codes = collections.defaultdict(list)
+		factions = collections.defaultdict(list)
+		faction_codes = collections.defaultdict(list)
+		series = collections.defaultdict(list)
+		rarities = collections.defaultdict(list)
+		rarity_codes = collections.defaultdict(list)
+		name_grams = collections.defaultdict(list)
+		name_gram_counts = array.array('I')
+		names = []
+		texts = []
+		ids = {}
+
+		for i, card in enumerate(self.cards):
+			ids.setdefault(str(card.get('id')), i)
+			card_texts = self._get_texts(card)
+			texts.append(card_texts)
+			card_grams = set()
+			for text in card_texts:
+				card_grams.update(make_grams(text))
+			for gram in card_grams:
+				grams[gram].append(i)
+
+			card_names = tuple(dict.fromkeys(filter(None, (
+				self._engine.normalize_std_card_name(name)
+				for name in card.get('names') or [] if isinstance(name, str)
+			))))
+			names.append(card_names)
+			card_grams = set()
+			for name in card_names:
+				card_grams.update(make_name_grams(name))
+			for gram in card_grams:
+				name_grams[gram].append(i)
+			name_gram_counts.append(len(card_grams))
+
+			attributes = card.get('attributes', ())
+			if attributes:
+				costs[attributes[0]].append(i)
+			stats[''.join(map(str, attributes))].append(i)
+
+			type_codes[card.get('type_code', -1)].append(i)
+			factions[card.get('faction')].append(i)
+			faction_codes[card.get('faction_code', -1)].append(i)
+			series[card.get('series')].append(i)
+			rarities[card.get('rarity')].append(i)
+			rarity_codes[card.get('rarity_code', -1)].append(i)
+
+		self._texts = texts
+		self._names = names
+		self._name_grams = to_postings(name_grams)
+		self._name_gram_counts = name_gram_counts
+		self._columns = {column: NumericColumn(self.cards, column) for column in COLUMNS}
+		self._bitsets = collections.OrderedDict()
+		self._ids = ids
+		self._grams = to_postings(grams)
+		self._costs = to_postings(costs)
+		self._stats = to_postings(stats)
+		self._type_codes = to_postings(type_codes)
+		self._factions = to_postings(factions)
+		self._faction_codes = to_postings(faction_codes)
+		self._series = to_postings(series)
+		self._rarities = to_postings(rarities)
+		self._rarity_codes = to_postings(rarity_codes)
+
+	# search ---------------------------
+
+	def _to_bitset(self, positions: Sequence[int]) -> int:
+		bits = bytearray((len(self.cards) + 7) // 8)
+		for i in positions:
+			bits[i >> 3] |= 1 << (i & 7)
+		return int.from_bytes(bits, 'little')
+
+	def _get_bitset(self, key: Tuple, positions: Sequence[int]) -> int:
+		bitset = self._bitsets.get(key)
+		if bitset == None:
+			bitset = self._to_bitset(positions)
+			self._bitsets[key] = bitset
+			if len(self._bitsets) > BITSET_CACHE_SIZE:
+				self._bitsets.popitem(last=False)
+		else:
+			self._bitsets.move_to_end(key)
+		return bitset
+
+	def _get_postings(self, f: str) -> Tuple[List[Tuple[Tuple, Sequence[int]]], Union[str, type(None)]]:
+		# keyword -> (exact postings to union, text to match as substring or None)
+		if f == '':
+			return ([(('all', ), range(len(self.cards)))], None)
+		cost_match = PATTERN_COST.match(f)
+		if cost_match:
+			cost = int(cost_match.group(1))
+			return ([(('cost', cost), self._costs.get(cost, ()))], None)
+		if PATTERN_STATS.match(f):
+			return ([(('stats', f), self._stats.get(f, ()))], None)
+		range_match = parse_range(f)
+		if range_match:
+			column, lo, hi = range_match
+			return ([(('range', ) + range_match, self._columns[column].range(lo, hi))], None)
+		postings = [
+			(('faction', f), self._factions.get(f, ())),
+			(('series', f), self._series.get(f, ())),
+			(('rarity', f), self._rarities.get(f, ())),
+		]
+		for name, codes, code in (
+			('type_code', self._type_codes, self._engine.get_type_code(f)),
+			('faction_code', self._faction_codes, self._engine.get_faction_code(f)),
+			('rarity_code', self._rarity_codes, self._engine.get_rarity_code(f)),
+		):
+			if code >= 0:
+				postings.append(((name, code), codes.get(code, ())))
+		return ([x for x in postings if len(x[1])], f)
+
+	def _get_text_postings(self, f: str) -> List[Tuple[Tuple, Sequence[int]]]:
+		if len(f) == 1:
+			return [(('gram', f), self._grams.get(f, ()))]
+		return sorted(
+			(
+				(('gram', gram), self._grams.get(gram, ()))
+				for gram in make_grams(f) if len(gram) == 2
+			),
+			key=lambda x: len(x[1])
+		)
+
+	def estimate(self, f: str) -> int:
+		# upper bound of matched cards, from posting sizes only
+		postings, text = self._get_postings(f)
+		count = sum(len(x[1]) for x in postings)
+		if text != None:
+			count += len(self._get_text_postings(text)[0][1])
+		return min(count, len(self.cards))
+
+	def _match_text(self, f: str, within: int) -> int:
+		text_postings = self._get_text_postings(f)
+		candidates = within
+		for key, posting in text_postings:
+			if not candidates:
+				break
+			candidates &= self._get_bitset(key, posting)
+		if len(f) == 1 or not candidates:
+			return candidates
+		# bigrams only narrow down, verify the substring itself
+		return self._to_bitset([
+			i for i in from_bitset(candidates)
+			if any(map(lambda x: f in x, self._texts[i]))
+		])
+
+	def _search_bitset(self, f: str, within: int) -> int:
+		postings, text = self._get_postings(f)
+		bitset = 0
+		for key, posting in postings:
+			bitset |= self._get_bitset(key, posting)
+		bitset &= within
+		if text != None:
+			bitset |= self._match_text(text, within & ~bitset)
+		return bitset
+
+	def _is_text(self, f: str) -> bool:
+		return self._get_postings(f)[1] != None
+
+	def _count_name_grams(self, name: str, within: Set[int]=None) -> Tuple[int, Dict[int, int]]:
+		# shared trigrams with the normalized name, per card
+		grams = make_name_grams(name)
+		counts = collections.Counter()
+		for gram in grams:
+			posting = self._name_grams.get(gram, ())
+			counts.update(posting if within == None else filter(within.__contains__, posting))
+		return (len(grams), counts)
+
+	def _similarity(self, size: int, i: int, count: int) -> float:
+		return count / (size + self._name_gram_counts[i] - count)
+
+	def fuzzy_search(self, f: str, limit: int=FUZZY_LIMIT, threshold: float=FUZZY_THRESHOLD) -> List[int]:
+		# names sharing the most trigrams with the keyword, tolerates typos
+		name = self._engine.normalize_std_card_name(f)
+		if not name:
+			return []
+		size, counts = self._count_name_grams(name)
+		scores = (
+			(score, i) for score, i in (
+				(self._similarity(size, i, count), i) for i, count in counts.items()
+			) if score >= threshold
+		)
+		return [i for _, i in heapq.nlargest(limit, scores, key=lambda x: (x[0], -x[1]))]
+
+	def rank(self, positions: List[int], filters: List[str], k: int) -> List[int]:
+		# move the k most relevant names to the front, the rest keep dataset order
+		names = [
+			name for name in dict.fromkeys(
+				self._engine.normalize_std_card_name(f) for f in filters if self._is_text(f)
+			) if name
+		]
+		if k <= 0 or not names or len(positions) <= 1:
+			return positions
+		within = set(positions)
+		scores = collections.defaultdict(float)
+		for name in names:
+			size, counts = self._count_name_grams(name, within)
+			for i, count in counts.items():
+				scores[i] += self._similarity(size, i, count)
+			for i in positions:
+				card_names = self._names[i]
+				if name in card_names:
+					scores[i] += RANK_EXACT
+				elif any(map(lambda x: x.startswith(name), card_names)):
+					scores[i] += RANK_PREFIX
+				elif any(map(lambda x: name in x, card_names)):
+					scores[i] += RANK_CONTAIN
+		top = heapq.nlargest(k, scores, key=lambda i: (scores[i], -i))
+		top_set = set(top)
+		return top + [i for i in positions if i not in top_set]
+
+	def plan(self, filters: List[str]) -> List[Tuple[str, int]]:
+		# most selective keywords first, duplicates evaluated once
+		return sorted(
+			((f, self.estimate(f)) for f in dict.fromkeys(filters)),
+			key=lambda x: x[1]
+		)
+
+	def execute(self, plan: List[Tuple[str, int]], fuzzy: bool=False) -> List[int]:
+		everything = (1 << len(self.cards)) - 1
+		result = everything
+		for f, _ in plan:
+			if not result:
+				break
+			matched = self._search_bitset(f, result)
+			# a text keyword matching no card at all is taken as a misspelled name
+			if not matched and fuzzy and self._is_text(f) and not self._search_bitset(f, everything):
+				matched = self._to_bitset(self.fuzzy_search(f)) & result
+			result = matched
+		return from_bitset(result)
+
+	def get_cards(self, positions: Iterable[int]) -> List[Dict]:
+		return [self.cards[i] for i in positions]
+
+	def get_card_by_id(self, id: Union[str, int]) -> Union[Dict, type(None)]:
+		i = self._ids.get(str(id))
+		return None if i == None else self.cards[i]
+
+	def get_cards_by_ids(self, ids: Iterable[Union[str, int]]) -> List[Union[Dict, type(None)]]:
+		return [self.get_card_by_id(id) for id in ids]
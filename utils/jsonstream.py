@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Any, Tuple, List, NoReturn
+
+import json
+import codecs
+
+WHITESPACE = ' \t\n\r'
+
+class ObjectItemsDecoder():
+
+	# decode the members of a top level json object from chunks as they arrive
+	def __init__(self, encoding: str='UTF-8'):
+		self._decoder = json.JSONDecoder()
+		self._text_decoder = codecs.getincrementaldecoder(encoding)()
+		self._buffer = ''
+		self._pos = 0
+		self._state = 'start'
+		self._key = None
+
+	def _skip_whitespace(self) -> bool:
+		while self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE:
+			self._pos += 1
+		return self._pos < len(self._buffer)
+
+	def _expect(self, chars: str) -> str:
+		char = self._buffer[self._pos]
+		if char not in chars:
+			raise ValueError(f"unexpected {char!r} at {self._pos}, expect one of {chars!r}")
+		self._pos += 1
+		return char
+
+	def _decode(self, final: bool) -> Tuple[bool, Any]:
+		try:
+			value, end = self._decoder.raw_decode(self._buffer, self._pos)
+		except json.JSONDecodeError:
+			if final:
+				raise
+			return (False, None)
+		# a value touching the end of the buffer may be cut, e.g. a number
+		if end >= len(self._buffer) and not final:
+			return (False, None)
+		self._pos = end
+		return (True, value)
+
+	def _parse(self, final: bool=False) -> List[Tuple[str, Any]]:
+		items = []
+		while self._state != 'end' and self._skip_whitespace():
+			if self._state == 'start':
+				self._expect('{')
+				self._state = 'first'
+			elif self._state in ('first', 'key'):
+				if self._state == 'first' and self._buffer[self._pos] == '}':
+					self._pos += 1
+					self._state = 'end'
+					continue
+				if self._buffer[self._pos] != '"':
+					self._expect('"')
+				ok, self._key = self._decode(final)
+				if not ok:
+					break
+				self._state = 'colon'
+			elif self._state == 'colon':
+				self._expect(':')
+				self._state = 'value'
+			elif self._state == 'value':
+				ok, value = self._decode(final)
+				if not ok:
+					break
+				items.append((self._key, value))
+				self._state = 'comma'
+			elif self._state == 'comma':
+				self._state = 'key' if self._expect(',}') == ',' else 'end'
+		self._buffer = self._buffer[self._pos:]
+		self._pos = 0
+		return items
+
+	def feed(self, data: bytes) -> List[Tuple[str, Any]]:
+		self._buffer += self._text_decoder.decode(data)
+		return self._parse()
+
+	def close(self) -> List[Tuple[str, Any]]:
+		self._buffer += self._text_decoder.decode(b'', final=True)
+		items = self._parse(final=True)
+		if self._state != 'end':
+			raise ValueError('unexpected end of json object')
+		return items
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import List
+
+import re
+import array
+
+SEPEND = r'[；，。！」]'
+SEPARATORS = [
+	re.compile(x) for x in (
+		' ', '，', '、', '；', '—', '……',
+		f'。(?!{SEPEND})', f'！(?!{SEPEND})',
+		'(?<!^)(?=（)', f'）(?!{SEPEND})',
+		'(?<!^)(?=「)', f'」(?!{SEPEND})',
+		# '(?<=<br>)',
+	)
+]
+
+def utf8_size(text: str) -> int:
+	# display width, multibyte characters count about double
+	return int((len(text.encode('UTF-8'))-len(text))/2+len(text))
+
+def get_breaks(text: str) -> List[int]:
+	breaks = {len(text)}
+	for pattern in SEPARATORS:
+		breaks.update(m.end() for m in pattern.finditer(text))
+	breaks.discard(0)
+	return sorted(breaks)
+
+def break_line(text: str, line_size_max: int) -> List[str]:
+	# cut where the line size is closest to line_size_max, in one pass over the breaks
+	extra = array.array('I', [0])
+	for char in text:
+		extra.append(extra[-1] + len(char.encode('UTF-8')) - 1)
+
+	def size(start: int, end: int) -> int:
+		return (extra[end] - extra[start]) // 2 + end - start
+
+	breaks = get_breaks(text)
+	result = []
+	start = 0
+	j = 0
+	while size(start, len(text)) > line_size_max:
+		while breaks[j] <= start:
+			j += 1
+		# breaks[j] is the last break not over line_size_max, if any
+		while j + 1 < len(breaks) and size(start, breaks[j+1]) <= line_size_max:
+			j += 1
+		end = min(
+			breaks[j:j+2],
+			key=lambda x: (abs(size(start, x) - line_size_max), x)
+		)
+		result.append(text[start:end])
+		start = end
+	if start < len(text):
+		result.append(text[start:])
+	return result
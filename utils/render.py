@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Tuple, List, Dict
+
+import io
+import PIL
+import PIL.Image
+import PIL.ImageFont
+import PIL.ImageDraw
+
+from . import fonts
+
+# plain functions on plain arguments, so they can run in a worker thread or process
+
+def decode_image(data: bytes) -> PIL.Image.Image:
+	image = PIL.Image.open(io.BytesIO(data))
+	try:
+		return image.convert("RGBA")
+	finally:
+		image.close()
+
+def encode_image(image: PIL.Image.Image, format: str='PNG') -> bytes:
+	with io.BytesIO() as f:
+		image.save(f, format=format)
+		return f.getvalue()
+
+def crop_image_data(image: PIL.Image.Image, box: Tuple[int, int, int, int], format: str='PNG') -> bytes:
+	crop = image.crop(box)
+	try:
+		return encode_image(crop, format)
+	finally:
+		crop.close()
+
+def get_text_sizes(lines: List[str], font: PIL.ImageFont.FreeTypeFont) -> List[Tuple[int, int]]:
+	metrics = fonts.get_font_metrics(font)
+	with fonts.get_font_lock(font):
+		return [metrics.get_size(line) for line in lines]
+
+def get_multiline_textsize(sizes: List[Tuple[int, int]], spacing: int=4) -> Tuple[int, int]:
+	return (max(sizes)[0], sum(list(zip(*sizes))[1])+spacing*(len(sizes)-1))
+
+def render_cards_info(card_images: List[PIL.Image.Image], text_sections: List[List[str]], config: Dict) -> PIL.Image.Image:
+
+	font = fonts.get_font(config['font'], config['font_size'])
+
+	card_width_min = min(map(lambda x: x.size[0], card_images))
+
+	text_line_sizes = []
+	text_sizes = []
+
+	for text_lines in text_sections:
+		line_sizes = get_text_sizes(text_lines, font)
+		text_line_sizes.append(line_sizes)
+		text_sizes.append(get_multiline_textsize(line_sizes, config['font_spacing']))
+
+	# card images are shared, only copy the ones that have to shrink
+	card_images = list(card_images)
+	resized_images = []
+	for i, card_image in enumerate(card_images):
+		if card_image.size[0] > card_width_min:
+			card_image = card_image.copy()
+			card_image.thumbnail((card_width_min, card_image.size[1]), PIL.Image.ANTIALIAS)
+			card_images[i] = card_image
+			resized_images.append(card_image)
+
+	card_width_max = card_width_min
+	card_margin = config['card_margin']
+
+	image_size = (
+		max(map(
+			lambda i: card_images[i].size[0] + text_sizes[i][0],
+			range(len(card_images))
+		)) + card_margin * 3,
+		sum(map(
+			lambda i: max(card_images[i].size[1], text_sizes[i][1]),
+			range(len(card_images))
+		)) + card_margin * (len(card_images) + 1)
+	)
+
+	image = PIL.Image.new(mode='RGBA', size=image_size, color='white')
+	draw = PIL.ImageDraw.Draw(image)
+
+	section_top = card_margin
+	for i in range(len(card_images)):
+		section_height = max(card_images[i].size[1], text_sizes[i][1])
+		image.paste(
+			im=card_images[i],
+			box=(
+				int((card_width_max-card_images[i].size[0])/2) + card_margin,
+				int((section_height-card_images[i].size[1])/2) + section_top,
+			),
+			mask=card_images[i]
+		)
+		text_size = text_sizes[i]
+		top = section_top + int((section_height-text_size[1])/2)
+		left = card_width_max + card_margin * 2
+		text_lines = text_sections[i]
+		# a freetype face must not be used by two threads at once
+		with fonts.get_font_lock(font):
+			for text_line, line_size in zip(text_lines, text_line_sizes[i]):
+				draw.text(
+					xy=(left, top),
+					text=text_line,
+					fill='black',
+					font=font,
+					anchor='la',
+					spacing=0,
+					align='left',
+					# direction=None,
+					# features=None,
+					# language=None,
+					stroke_width=0,
+					stroke_fill=None,
+					embedded_color=False
+				)
+				top += line_size[1] + config['font_spacing']
+		section_top += section_height + card_margin
+
+	any(map(lambda x: x.close(), resized_images))
+
+	return image
+
+def render_cards_info_data(card_images: List[PIL.Image.Image], text_sections: List[List[str]], config: Dict, format: str='PNG') -> bytes:
+	image = render_cards_info(card_images, text_sections, config)
+	try:
+		return encode_image(image, format)
+	finally:
+		image.close()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Hashable, Dict, TypedDict, NoReturn
+
+import aiohttp
+
+class TypeSessionConfig(TypedDict, total=False):
+	limit:             int
+	limit_per_host:    int
+	keepalive_timeout: float
+	ttl_dns_cache:     int
+
+DEFAULT_SESSION_CONFIG = {
+	'limit':             32,
+	'limit_per_host':    8,
+	'keepalive_timeout': 30,
+	'ttl_dns_cache':     300,
+}
+
+class SessionPool():
+
+	def __init__(self):
+		self._sessions: Dict[Hashable, aiohttp.ClientSession] = {}
+
+	def get(self, key: Hashable, config: TypeSessionConfig=None) -> aiohttp.ClientSession:
+		session = self._sessions.get(key)
+		if session == None or session.closed:
+			config = {**DEFAULT_SESSION_CONFIG, **(config or {})}
+			connector = aiohttp.TCPConnector(
+				limit=config['limit'],
+				limit_per_host=config['limit_per_host'],
+				keepalive_timeout=config['keepalive_timeout'],
+				use_dns_cache=True,
+				ttl_dns_cache=config['ttl_dns_cache'],
+			)
+			session = aiohttp.ClientSession(connector=connector)
+			self._sessions[key] = session
+		return session
+
+	async def close(self) -> NoReturn:
+		sessions = list(self._sessions.values())
+		self._sessions.clear()
+		for session in sessions:
+			if not session.closed:
+				await session.close()
+
+pool = SessionPool()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Any, Callable, TypedDict, NoReturn
+
+import asyncio
+import functools
+import concurrent.futures
+
+class TypeWorkerConfig(TypedDict, total=False):
+	executor:    str
+	max_workers: int
+	max_pending: int
+
+# executor is 'thread' or 'process', max_pending bounds the jobs queued or running
+DEFAULT_WORKER_CONFIG = {
+	'executor':    'thread',
+	'max_workers': 2,
+	'max_pending': 8,
+}
+
+class WorkerPool():
+
+	# cpu bound work off the event loop, functions and arguments must be picklable for 'process'
+	def __init__(self, config: TypeWorkerConfig=None):
+		self._config = {**DEFAULT_WORKER_CONFIG, **(config or {})}
+		self._executor = None
+		self._semaphore = None
+
+	def _get_executor(self) -> concurrent.futures.Executor:
+		if self._executor == None:
+			if self._config['executor'] == 'process':
+				self._executor = concurrent.futures.ProcessPoolExecutor(
+					max_workers=self._config['max_workers']
+				)
+			elif self._config['executor'] == 'thread':
+				self._executor = concurrent.futures.ThreadPoolExecutor(
+					max_workers=self._config['max_workers'],
+					thread_name_prefix='shadowverse'
+				)
+			else:
+				raise ValueError(f"unknown executor {self._config['executor']!r}")
+		return self._executor
+
+	async def run(self, func: Callable, *args, **kwargs) -> Any:
+		if self._semaphore == None:
+			self._semaphore = asyncio.Semaphore(self._config['max_pending'])
+		async with self._semaphore:
+			return await asyncio.get_running_loop().run_in_executor(
+				self._get_executor(),
+				functools.partial(func, *args, **kwargs)
+			)
+
+	async def close(self) -> NoReturn:
+		if self._executor != None:
+			self._executor.shutdown(wait=False)
+			self._executor = None
+
+pool = WorkerPool()